@@ -0,0 +1,95 @@
+"""
+Arrow IPC snapshots of connected datasets, for the 'arrow' search engine.
+
+Each dataset version is written once, from the row table, to
+settings.DATASET_ARROW_DIR/<database id>-v<data_version>.arrow. Every
+worker process memory-maps the same file, so the column data sits once in
+the OS page cache instead of being decoded into each worker's memory.
+
+Columns keep their inferred types (numbers stay numbers), and text columns
+with few distinct values (wards, schemes, statuses) are dictionary-encoded.
+
+pyarrow is optional: without it the 'arrow' engine is simply unavailable.
+"""
+import glob
+import os
+import tempfile
+from django.conf import settings
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.ipc
+except ImportError: # Optional dependency
+    pa = None
+
+# Text columns with at most this share of distinct values are dictionary-encoded
+DICTIONARY_MAX_RATIO = 0.5
+
+
+def available():
+    return pa is not None
+
+
+def dataset_path(db_id, data_version):
+    return os.path.join(settings.DATASET_ARROW_DIR, f"{db_id}-v{data_version}.arrow")
+
+
+def _column_array(values):
+    try:
+        array = pa.array(values, from_pandas=True) # NaN from pandas becomes null
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        array = None
+    if array is None or pa.types.is_nested(array.type) or pa.types.is_null(array.type):
+        # Mixed or nested values: keep them as text
+        array = pa.array([None if value is None else str(value) for value in values], type=pa.string())
+    if pa.types.is_string(array.type) and len(array):
+        if pc.count_distinct(array).as_py() <= len(array) * DICTIONARY_MAX_RATIO:
+            array = array.dictionary_encode()
+    return array
+
+
+def rows_to_table(rows):
+    """Builds an Arrow table from row dicts, one typed column per key"""
+    names = dict.fromkeys(column for row in rows for column in row)
+    return pa.table({str(name): _column_array([row.get(name) for row in rows]) for name in names})
+
+
+def write_dataset(db_record):
+    """Writes db_record's current rows to its Arrow file; returns the path"""
+    from . import row_store # row_store imports search_index, which imports this module
+    path = dataset_path(db_record.id, db_record.data_version)
+    os.makedirs(settings.DATASET_ARROW_DIR, exist_ok=True)
+    table = rows_to_table(row_store.load_rows(db_record))
+    # Write then rename, so a concurrent reader never maps a partial file
+    fd, tmp_path = tempfile.mkstemp(suffix='.arrow.tmp', dir=settings.DATASET_ARROW_DIR)
+    os.close(fd)
+    try:
+        with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    print(f"🏹 Wrote Arrow snapshot of {db_record.name} v{db_record.data_version} ({table.num_rows} rows, {table.nbytes / 1e6:.1f} MB)")
+    return path
+
+
+def open_table(db_record):
+    """Memory-maps db_record's Arrow file for its current data_version, writing it first if needed"""
+    path = dataset_path(db_record.id, db_record.data_version)
+    if not os.path.exists(path):
+        write_dataset(db_record)
+        delete_dataset_files(db_record.id, keep_version=db_record.data_version)
+    return pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+
+
+def delete_dataset_files(db_id, keep_version=None):
+    """Removes db_id's Arrow files (workers still mapping one keep reading it until they let go)"""
+    keep = dataset_path(db_id, keep_version) if keep_version is not None else None
+    for path in glob.glob(os.path.join(settings.DATASET_ARROW_DIR, f"{db_id}-v*.arrow")):
+        if path != keep:
+            try:
+                os.remove(path)
+            except FileNotFoundError: # Another worker got there first
+                pass
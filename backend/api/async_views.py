@@ -0,0 +1,135 @@
+"""
+Async versions of the call-control views, for ASGI workers.
+
+start-outbound-calling, start-inbound-agent and upload-document spend
+nearly all their time waiting on Vapi (and Gemini, for the inbound agent).
+The sync views hold a WSGI worker thread for each of those waits; these
+await AsyncVAPIService instead, so one event loop keeps many of them in
+flight. urls.py serves them when settings.ASYNC_CONTROL_VIEWS is on, which
+is meant for lokmitra_backend/asgi.py deployments. Requests and responses
+match the DRF views in views.py; `python manage.py benchmark_control_paths`
+compares the two.
+"""
+import json
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from .models import CallingSession, KnowledgeDocument
+from .vapi_service import AsyncVAPIService
+from .views import enabled_call_tools
+
+
+def _request_data(request):
+    """JSON or form body, as DRF's request.data would parse it; None if the JSON is malformed"""
+    if request.content_type == 'application/json':
+        try:
+            return json.loads(request.body or b'{}')
+        except json.JSONDecodeError:
+            return None
+    return request.POST
+
+
+@csrf_exempt
+@require_POST
+async def start_outbound_calling(request):
+    """Async start_outbound_calling (views.py)"""
+    data = _request_data(request)
+    if data is None:
+        return JsonResponse({'success': False, 'error': 'Malformed JSON body'}, status=400)
+    phone_number = data.get('phone_number')
+    file_ids = data.get('file_ids', [])
+
+    if not phone_number:
+        return JsonResponse({'success': False, 'error': 'phone_number is required'}, status=400)
+
+    agent_config, enabled_base_tool_ids, all_tool_ids = await sync_to_async(enabled_call_tools)()
+    print(f"📞 Starting outbound call with enabled tool IDs: {enabled_base_tool_ids + all_tool_ids}")
+    print(f"🤖 Using Agent: {agent_config.name}")
+
+    service = AsyncVAPIService()
+    call_response = await service.start_outbound_call(
+        phone_number,
+        all_tool_ids,
+        file_ids,
+        agent_name=agent_config.name,
+        agent_description=agent_config.description,
+        enabled_base_tool_ids=enabled_base_tool_ids
+    )
+
+    if call_response:
+        session = await CallingSession.objects.acreate(session_id=call_response.get('id'), is_active=True)
+        return JsonResponse({
+            'success': True,
+            'session_id': session.session_id,
+            'call_id': call_response.get('id')
+        })
+
+    return JsonResponse({'success': False, 'error': 'VAPI Outbound Call Failed'}, status=500)
+
+
+@csrf_exempt
+@require_POST
+async def start_inbound_agent(request):
+    """Async start_inbound_agent (views.py)"""
+    data = _request_data(request)
+    if data is None:
+        return JsonResponse({'success': False, 'error': 'Malformed JSON body'}, status=400)
+    file_ids = data.get('file_ids', [])
+
+    agent_config, enabled_base_tool_ids, all_tool_ids = await sync_to_async(enabled_call_tools)()
+    print(f"📞 Starting inbound agent with enabled tool IDs: {enabled_base_tool_ids + all_tool_ids}")
+    print(f"🤖 Using Agent: {agent_config.name}")
+
+    service = AsyncVAPIService()
+    agent_response = await service.start_inbound_agent(
+        all_tool_ids,
+        file_ids,
+        agent_name=agent_config.name,
+        agent_description=agent_config.description,
+        enabled_base_tool_ids=enabled_base_tool_ids
+    )
+
+    if agent_response:
+        assistant_id = agent_response.get('assistant_id') or agent_response.get('id')
+        session = await CallingSession.objects.acreate(session_id=assistant_id, is_active=True)
+        return JsonResponse({
+            'success': True,
+            'session_id': session.session_id,
+            'assistant_id': assistant_id,
+            'message': 'Inbound agent activated successfully'
+        })
+
+    return JsonResponse({'success': False, 'error': 'VAPI Inbound Agent Failed'}, status=500)
+
+
+@csrf_exempt
+@require_POST
+async def upload_document(request):
+    """Async upload_document (views.py)"""
+    file_obj = request.FILES.get('file')
+    if not file_obj:
+        return JsonResponse({'success': False, 'error': 'No file provided'}, status=400)
+
+    service = AsyncVAPIService()
+
+    # 1. Upload to Vapi
+    vapi_response = await service.upload_file(file_obj)
+    if not vapi_response:
+        return JsonResponse({'success': False, 'error': 'Vapi upload failed'}, status=500)
+
+    new_id = vapi_response.get('id')
+
+    # 2. Save it locally, then point the Vapi query tool at every document
+    await KnowledgeDocument.objects.acreate(vapi_file_id=new_id, file_name=file_obj.name)
+    all_ids = [file_id async for file_id in KnowledgeDocument.objects.values_list('vapi_file_id', flat=True)]
+    print(f"📚 All Document IDs for Vapi Tool Update: {all_ids}")
+
+    if await service.update_query_tool(all_ids):
+        return JsonResponse({
+            'success': True,
+            'file_id': new_id,
+            'name': file_obj.name
+        })
+
+    return JsonResponse({'success': False, 'error': 'DB saved but Vapi Tool sync failed'}, status=500)
@@ -0,0 +1,244 @@
+"""
+Shared HTTP client for the Vapi, Supabase Management and Google export APIs.
+
+Calls used to go through bare requests.post / patch, so every tool creation
+and call start opened a new TCP + TLS connection, and several had no
+timeout. request() sends them through one keep-alive requests.Session per
+process, with a connection pool per host, so back-to-back calls reuse warm
+connections.
+
+Every call gets (HTTP_CLIENT_CONNECT_TIMEOUT_SECONDS,
+HTTP_CLIENT_READ_TIMEOUT_SECONDS) unless it passes its own timeout. 429 and
+5xx responses, and connections that could not be opened, are retried up to
+HTTP_CLIENT_MAX_RETRIES times with jittered exponential backoff (429 honours
+Retry-After). A POST is not idempotent: after a 500, 502 or 504, or a
+dropped connection, it may already have created its tool or started its
+call, so a POST is only retried on 429 and 503 (the request was refused)
+or when its connection was never opened.
+
+Latency, retries and errors are counted per endpoint; see http_stats().
+
+async_request() is the same client for the async views (api/async_views.py):
+one httpx.AsyncClient per event loop, the same timeouts, retry policy and
+stats. httpx is optional; without it only the async views are unavailable.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+from collections import deque
+from urllib.parse import urlsplit
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+try:
+    import httpx
+except ImportError: # Optional dependency
+    httpx = None
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Statuses meaning the request was refused; after any other one a repeated POST could duplicate it
+NON_IDEMPOTENT_RETRY_STATUSES = {429, 503}
+NON_IDEMPOTENT_METHODS = {'POST'}
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """This process's pooled keep-alive session (a forked worker builds its own)"""
+    global _session, _session_pid
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=settings.HTTP_CLIENT_POOL_HOSTS,
+                pool_maxsize=settings.HTTP_CLIENT_POOL_SIZE,
+            )
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session, _session_pid = session, os.getpid()
+        return _session
+
+
+class EndpointStats:
+    """Counters and recent latencies of the requests to one endpoint"""
+
+    RECENT = 200
+
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.errors = 0 # Failed after the last attempt: an error status or no response
+        self.latencies = deque(maxlen=self.RECENT) # Seconds per request, retries and backoff included
+
+    def snapshot(self):
+        latencies = sorted(self.latencies)
+        return {
+            'requests': self.requests,
+            'retries': self.retries,
+            'errors': self.errors,
+            'latency_ms': {
+                'p50': round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+                'p95': round(latencies[int(len(latencies) * 0.95)] * 1000, 1) if latencies else None,
+                'max': round(latencies[-1] * 1000, 1) if latencies else None,
+            },
+        }
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def _record(endpoint, seconds, retries, failed):
+    with _stats_lock:
+        stats = _stats.get(endpoint)
+        if stats is None:
+            stats = _stats[endpoint] = EndpointStats()
+        stats.requests += 1
+        stats.retries += retries
+        stats.errors += failed
+        stats.latencies.append(seconds)
+
+
+def _endpoint_name(method, url):
+    # e.g. "POST api.vapi.ai/tool"; path segments with digits (ids) are collapsed
+    parts = urlsplit(url)
+    path = "/".join(':id' if any(c.isdigit() for c in segment) else segment for segment in parts.path.split('/'))
+    return f"{method} {parts.netloc}{path}"
+
+
+def _never_sent(error):
+    """True when the connection was never opened (refused, DNS failure, connect timeout)"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def _backoff_seconds(attempt, response):
+    delay = settings.HTTP_CLIENT_BASE_BACKOFF_SECONDS * 2 ** attempt
+    retry_after = response.headers.get('Retry-After') if response is not None else None
+    if retry_after:
+        try:
+            delay = max(delay, float(retry_after))
+        except ValueError: # An HTTP date; the exponential delay will do
+            pass
+    delay = min(delay, settings.HTTP_CLIENT_MAX_BACKOFF_SECONDS)
+    # Jitter, so workers that were throttled together don't retry together
+    return delay * random.uniform(0.5, 1.5)
+
+
+def request(method, url, endpoint=None, **kwargs):
+    """
+    Sends a request through the shared session and returns the final
+    response, like requests.request. Raises requests exceptions for
+    failures without a response once retries are used up.
+    """
+    method = method.upper()
+    endpoint = endpoint or _endpoint_name(method, url)
+    kwargs.setdefault('timeout', (settings.HTTP_CLIENT_CONNECT_TIMEOUT_SECONDS, settings.HTTP_CLIENT_READ_TIMEOUT_SECONDS))
+    idempotent = method not in NON_IDEMPOTENT_METHODS
+    retry_statuses = RETRY_STATUSES if idempotent else NON_IDEMPOTENT_RETRY_STATUSES
+    session = get_session()
+    started = time.perf_counter()
+    attempt = 0
+    while True:
+        response = None
+        try:
+            response = session.request(method, url, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            # Only a connection that was never opened is known not to have sent the request
+            retryable = idempotent or _never_sent(e)
+            if not retryable or attempt >= settings.HTTP_CLIENT_MAX_RETRIES:
+                _record(endpoint, time.perf_counter() - started, attempt, True)
+                raise
+            print(f"⚠️ {endpoint} failed ({e.__class__.__name__}), retry {attempt + 1}/{settings.HTTP_CLIENT_MAX_RETRIES}")
+        else:
+            if response.status_code not in retry_statuses or attempt >= settings.HTTP_CLIENT_MAX_RETRIES:
+                _record(endpoint, time.perf_counter() - started, attempt, response.status_code >= 400)
+                return response
+            print(f"⚠️ {endpoint} returned {response.status_code}, retry {attempt + 1}/{settings.HTTP_CLIENT_MAX_RETRIES}")
+        time.sleep(_backoff_seconds(attempt, response))
+        attempt += 1
+
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
+
+
+def patch(url, **kwargs):
+    return request('PATCH', url, **kwargs)
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+_async_clients = weakref.WeakKeyDictionary() # event loop -> httpx.AsyncClient
+
+
+def get_async_client():
+    """The running event loop's pooled httpx.AsyncClient (clients can't be shared across loops)"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.HTTP_CLIENT_READ_TIMEOUT_SECONDS, connect=settings.HTTP_CLIENT_CONNECT_TIMEOUT_SECONDS),
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_CLIENT_ASYNC_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_CLIENT_POOL_SIZE,
+            ),
+        )
+    return client
+
+
+async def async_request(method, url, endpoint=None, **kwargs):
+    """
+    The asyncio counterpart of request(): returns the final httpx.Response
+    and raises httpx exceptions for failures without a response.
+    """
+    method = method.upper()
+    endpoint = endpoint or _endpoint_name(method, url)
+    idempotent = method not in NON_IDEMPOTENT_METHODS
+    retry_statuses = RETRY_STATUSES if idempotent else NON_IDEMPOTENT_RETRY_STATUSES
+    client = get_async_client()
+    started = time.perf_counter()
+    attempt = 0
+    while True:
+        response = None
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            # Only a connection that was never opened is known not to have sent the request
+            retryable = idempotent or isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout))
+            if not retryable or attempt >= settings.HTTP_CLIENT_MAX_RETRIES:
+                _record(endpoint, time.perf_counter() - started, attempt, True)
+                raise
+            print(f"⚠️ {endpoint} failed ({e.__class__.__name__}), retry {attempt + 1}/{settings.HTTP_CLIENT_MAX_RETRIES}")
+        else:
+            if response.status_code not in retry_statuses or attempt >= settings.HTTP_CLIENT_MAX_RETRIES:
+                _record(endpoint, time.perf_counter() - started, attempt, response.status_code >= 400)
+                return response
+            print(f"⚠️ {endpoint} returned {response.status_code}, retry {attempt + 1}/{settings.HTTP_CLIENT_MAX_RETRIES}")
+        await asyncio.sleep(_backoff_seconds(attempt, response))
+        attempt += 1
+
+
+async def async_post(url, **kwargs):
+    return await async_request('POST', url, **kwargs)
+
+
+async def async_patch(url, **kwargs):
+    return await async_request('PATCH', url, **kwargs)
+
+
+def http_stats():
+    """Per-endpoint request counts, retries, errors and latency percentiles of this process"""
+    with _stats_lock:
+        return {endpoint: stats.snapshot() for endpoint, stats in sorted(_stats.items())}
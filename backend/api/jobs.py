@@ -0,0 +1,129 @@
+"""
+Brokerless background worker for IngestionJob.
+
+The connect endpoints create an IngestionJob, hand the slow work (parsing,
+Gemini calls, edge deploys, Vapi tool creation, indexing) to a small thread
+pool in the same process and return 202 right away. Progress and per-stage
+timings are written to the job row, which the frontend polls.
+
+Jobs run in the process that accepted them; a job whose process restarts
+mid-way stays 'running' and should simply be retried by the user.
+"""
+import os
+import tempfile
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from .models import IngestionJob
+
+_executor = ThreadPoolExecutor(max_workers=settings.INGEST_WORKERS, thread_name_prefix='ingest')
+
+
+def create_job(source_type, name=''):
+    return IngestionJob.objects.create(source_type=source_type, name=name or '')
+
+
+@contextmanager
+def stage(job, name):
+    """Times a block of work and records it on the job as a completed stage"""
+    start = time.perf_counter()
+    yield
+    record_stage(job, name, time.perf_counter() - start)
+
+
+def record_stage(job, name, seconds):
+    """Records a completed stage that was timed elsewhere (e.g. in a worker process)"""
+    job.stage_timings[name] = round(seconds, 3)
+    job.stage = name
+    job.save(update_fields=['stage', 'stage_timings', 'updated_at'])
+    print(f"⏱️ Job {job.id}: {name} in {job.stage_timings[name]}s")
+
+
+def save_upload(file_obj):
+    """Copies an uploaded file to disk so a job can read it after the request ends"""
+    suffix = os.path.splitext(file_obj.name)[1]
+    fd, path = tempfile.mkstemp(suffix=suffix, prefix='ingest-', dir=settings.INGEST_UPLOAD_DIR)
+    with os.fdopen(fd, 'wb') as out:
+        for chunk in file_obj.chunks():
+            out.write(chunk)
+    return path
+
+
+def run_job(job, func, *args):
+    """
+    Runs func(job, *args) in the calling thread. func returns the result
+    payload; an exception fails the job with its message.
+    """
+    job.status = 'running'
+    job.save(update_fields=['status', 'updated_at'])
+    try:
+        job.result = func(job, *args) or {}
+        job.status = 'succeeded'
+    except Exception as e:
+        print(f"❌ Ingestion job {job.id} failed: {e}")
+        traceback.print_exc()
+        job.error = str(e)
+        job.status = 'failed'
+    finally:
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'result', 'error', 'finished_at', 'updated_at'])
+
+
+def submit(job, func, *args):
+    """Runs func(job, *args) on the ingestion pool; see run_job"""
+    def _run():
+        try:
+            run_job(job, func, *args)
+        finally:
+            connection.close()
+
+    _executor.submit(_run)
+    print(f"📬 Queued {job.source_type} ingestion job {job.id}")
+
+
+def submit_batch(batch, func, *args):
+    """
+    Runs func(batch, *args) on the ingestion pool, for work that spans
+    several jobs. func settles each job itself (normally via run_job); jobs
+    still unsettled when it returns or raises are failed.
+    """
+    def _run():
+        error = 'Batch ended before this file was processed'
+        try:
+            func(batch, *args)
+        except Exception as e:
+            print(f"❌ Ingestion batch failed: {e}")
+            traceback.print_exc()
+            error = str(e)
+        finally:
+            for job in batch:
+                if job.status in ('queued', 'running'):
+                    job.status = 'failed'
+                    job.error = error
+                    job.finished_at = timezone.now()
+                    job.save(update_fields=['status', 'error', 'finished_at', 'updated_at'])
+            connection.close()
+
+    _executor.submit(_run)
+    print(f"📬 Queued ingestion batch of {len(batch)} jobs")
+
+
+def job_payload(job):
+    return {
+        'job_id': job.id,
+        'source_type': job.source_type,
+        'name': job.name,
+        'status': job.status,
+        'stage': job.stage,
+        'stage_timings': job.stage_timings,
+        'total_seconds': round(sum(job.stage_timings.values()), 3),
+        'result': job.result,
+        'error': job.error,
+        'database_id': job.database_id,
+        'created_at': job.created_at,
+        'finished_at': job.finished_at,
+    }
@@ -0,0 +1,150 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor
+from api import async_views, views
+from api.models import CallingSession
+import asyncio
+import contextlib
+import io
+import itertools
+import json
+import os
+import statistics
+import threading
+import time
+
+
+class StubVapiHandler(BaseHTTPRequestHandler):
+    """Answers every Vapi request after a fixed delay, like a remote API would"""
+
+    protocol_version = 'HTTP/1.1' # Keep-alive, as api.vapi.ai
+    latency = 0.3
+    ids = itertools.count(1)
+
+    def _respond(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        time.sleep(self.latency)
+        body = json.dumps({"id": f"bench-{next(self.ids)}"}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_POST = do_PATCH = _respond
+
+    def log_message(self, *args):
+        pass
+
+
+class StubVapiServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024 # The async run opens every connection at once
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks start-outbound-calling through the sync views against the async views, with a stub Vapi API'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Outbound call requests per stack (default: 200)'
+        )
+        parser.add_argument(
+            '--sync-threads',
+            type=int,
+            default=8,
+            help='Worker threads serving the sync views, as a threaded WSGI worker would (default: 8)'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=200,
+            help='Requests the async views keep in flight on one event loop (default: 200)'
+        )
+        parser.add_argument(
+            '--vapi-latency-ms',
+            type=int,
+            default=300,
+            help='Delay of each stub Vapi response (default: 300)'
+        )
+
+    def make_request(self, factory):
+        return factory.post(
+            '/api/start-outbound-calling/',
+            data=json.dumps({"phone_number": "+910000000000", "file_ids": []}),
+            content_type='application/json',
+        )
+
+    # Both runs send the whole burst at once; latency is from the burst's start to each response
+
+    def run_sync(self, factory, count, threads):
+        started = time.perf_counter()
+
+        def _call(_):
+            try:
+                response = views.start_outbound_calling(self.make_request(factory))
+                return time.perf_counter() - started, response.status_code == 200
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            return list(pool.map(_call, range(count)))
+
+    async def run_async(self, factory, count, concurrency):
+        limit = asyncio.Semaphore(concurrency)
+        started = time.perf_counter()
+
+        async def _call():
+            async with limit:
+                response = await async_views.start_outbound_calling(self.make_request(factory))
+                return time.perf_counter() - started, response.status_code == 200
+
+        return await asyncio.gather(*(_call() for _ in range(count)))
+
+    def report(self, label, results, seconds):
+        latencies = sorted(latency for latency, _ in results)
+        failed = sum(1 for _, ok in results if not ok)
+        self.stdout.write(
+            f"  {label:<6} {len(results) / seconds:>8.1f} req/s | total {seconds:>7.2f} s | "
+            f"p50 {statistics.median(latencies) * 1000:>8.1f} ms | "
+            f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:>8.1f} ms | failed {failed}"
+        )
+
+    def handle(self, *args, **options):
+        StubVapiHandler.latency = options['vapi_latency_ms'] / 1000
+        server = StubVapiServer(('127.0.0.1', 0), StubVapiHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        os.environ['VAPI_BASE_URL'] = f"http://127.0.0.1:{server.server_port}"
+        factory = RequestFactory()
+        count = options['requests']
+
+        self.stdout.write(self.style.SUCCESS(f'\n{"="*60}'))
+        self.stdout.write(self.style.SUCCESS('⏱️ CALL-CONTROL PATH BENCHMARK (start-outbound-calling)'))
+        self.stdout.write(self.style.SUCCESS(f'{"="*60}'))
+        self.stdout.write(
+            f"\n📊 {count} requests, stub Vapi latency {options['vapi_latency_ms']} ms, "
+            f"{options['sync_threads']} sync threads vs {options['concurrency']} in flight on one event loop\n"
+        )
+
+        try:
+            # The views log every call; keep the report readable
+            with contextlib.redirect_stdout(io.StringIO()):
+                started = time.perf_counter()
+                sync_results = self.run_sync(factory, count, options['sync_threads'])
+                sync_seconds = time.perf_counter() - started
+
+                started = time.perf_counter()
+                async_results = asyncio.run(self.run_async(factory, count, options['concurrency']))
+                async_seconds = time.perf_counter() - started
+        finally:
+            server.shutdown()
+            CallingSession.objects.filter(session_id__startswith='bench-').delete()
+
+        self.report('sync', sync_results, sync_seconds)
+        self.report('async', async_results, async_seconds)
+        self.stdout.write(self.style.SUCCESS(f'\n{"="*60}\n'))
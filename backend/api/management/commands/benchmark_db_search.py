@@ -0,0 +1,111 @@
+from django.core.management.base import BaseCommand
+from rapidfuzz import process, fuzz
+from api.search_index import SEARCH_ENGINES, run_search
+import random
+import statistics
+import time
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks connected-database search engines against the original row loop on synthetic data'
+
+    FIRST_NAMES = ["Rajesh", "Priya", "Amit", "Sunita", "Ravi", "Anita", "Vikram", "Meena", "Suresh", "Kavita"]
+    LAST_NAMES = ["Kumar", "Sharma", "Patel", "Verma", "Singh", "Desai", "Reddy", "Iyer", "Gupta", "Joshi"]
+    SCHEMES = ["PM Kisan", "Ayushman Bharat", "Ujjwala", "Jan Dhan", "Awas Yojana", "Old Age Pension"]
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            nargs='+',
+            default=[10000, 100000, 1000000],
+            help='Dataset sizes to benchmark (default: 10000 100000 1000000)'
+        )
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=5,
+            help='Queries per kind (exact, prefix, fuzzy, miss) per engine (default: 5)'
+        )
+        parser.add_argument(
+            '--skip-legacy-above',
+            type=int,
+            default=1000000,
+            help='Skip the original loop for datasets larger than this (default: 1000000)'
+        )
+
+    def make_rows(self, count):
+        rng = random.Random(42)
+        return [
+            {
+                "citizen_id": f"CIT{i:07d}",
+                "name": f"{rng.choice(self.FIRST_NAMES)} {rng.choice(self.LAST_NAMES)} {i}",
+                "phone": f"9{rng.randint(100000000, 999999999)}",
+                "ward": f"Ward {rng.randint(1, 250)}",
+                "scheme": rng.choice(self.SCHEMES),
+            }
+            for i in range(count)
+        ]
+
+    def make_queries(self, rows, per_kind):
+        rng = random.Random(7)
+        sample = [rows[rng.randrange(len(rows))] for _ in range(per_kind * 3)]
+        exact = [row["phone"] for row in sample[:per_kind]]
+        prefix = [row["citizen_id"][:-2] for row in sample[per_kind:per_kind * 2]]
+        fuzzy = [row["name"].replace("a", "aa", 1) for row in sample[per_kind * 2:]]
+        miss = [f"zq{i}xv" for i in range(per_kind)]
+        return exact + prefix + fuzzy + miss
+
+    @staticmethod
+    def legacy_search(rows, search_query):
+        """The original execute_db_query loop, kept verbatim as the baseline"""
+        for row in rows:
+            if any(str(val).lower() == search_query.lower() for val in row.values()):
+                return {"results": [row], "match_type": "exact"}
+        row_strings = [" ".join(str(v) for v in r.values()) for r in rows]
+        matches = process.extract(search_query, row_strings, scorer=fuzz.partial_ratio, limit=3, score_cutoff=60)
+        results = [rows[match[2]] for match in matches]
+        return {"results": results, "status": "success" if results else "not_found"}
+
+    def time_queries(self, search, queries):
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            search(query)
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    def report(self, label, build_ms, timings):
+        self.stdout.write(
+            f"  {label:<10} build {build_ms:>9.1f} ms | "
+            f"median {statistics.median(timings):>9.2f} ms | max {max(timings):>9.2f} ms"
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(f'\n{"="*60}'))
+        self.stdout.write(self.style.SUCCESS('⏱️ CONNECTED DATABASE SEARCH BENCHMARK'))
+        self.stdout.write(self.style.SUCCESS(f'{"="*60}'))
+
+        for count in options['rows']:
+            rows = self.make_rows(count)
+            queries = self.make_queries(rows, options['queries'])
+            self.stdout.write(self.style.SUCCESS(f'\n📊 {count:,} rows, {len(queries)} queries'))
+
+            if count <= options['skip_legacy_above']:
+                timings = self.time_queries(lambda q: self.legacy_search(rows, q), queries)
+                self.report('legacy', 0.0, timings)
+            else:
+                self.stdout.write('  legacy     skipped')
+
+            for name, engine in SEARCH_ENGINES.items():
+                if hasattr(engine, 'from_record'):
+                    self.stdout.write(f'  {name:<10} skipped (reads a stored dataset file)')
+                    continue
+                start = time.perf_counter()
+                index = engine(rows)
+                build_ms = (time.perf_counter() - start) * 1000
+                timings = self.time_queries(lambda q: run_search(index, q), queries)
+                self.report(name, build_ms, timings)
+                del index
+
+        self.stdout.write(self.style.SUCCESS(f'\n{"="*60}\n'))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from api.models import SheetWriteOutbox
+from api.sheet_outbox import flush_due, outbox_stats
+import time
+
+
+class Command(BaseCommand):
+    help = 'Appends rows waiting in the Google Sheets write-behind outbox (e.g. left over from a restart)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help="Queue rows marked 'failed' for another round of attempts first"
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Keep running, flushing every N seconds (default: flush once and exit)'
+        )
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            retried = SheetWriteOutbox.objects.filter(status='failed').update(status='pending', attempts=0)
+            self.stdout.write(f'  Re-queued {retried} failed rows')
+        while True:
+            sent = flush_due()
+            stats = outbox_stats()
+            self.stdout.write(self.style.SUCCESS(
+                f"📤 Sent {sent} rows; {stats['queue_depth']} queued, {stats['by_status']['failed']} failed"
+            ))
+            if options['interval'] <= 0:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from api.sheet_sync import refresh_sheet, sheet_databases
+import time
+
+
+class Command(BaseCommand):
+    help = 'Applies edits made in connected Google Sheets to the stored rows and search indexes (run from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            nargs='+',
+            default=[],
+            help='Only refresh these connected databases (ids or names)'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Diff the rows even if the sheet looks unchanged'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Keep running, refreshing every N seconds (default: refresh once and exit)'
+        )
+
+    def refresh_all(self, options):
+        databases = sheet_databases()
+        if options['database']:
+            ids = [int(value) for value in options['database'] if value.isdigit()]
+            names = [value for value in options['database'] if not value.isdigit()]
+            databases = [db for db in databases if db.id in ids or db.name in names]
+
+        for db in databases:
+            try:
+                summary = refresh_sheet(db, force=options['force'])
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'❌ {db.name}: {e}'))
+                continue
+            if summary['status'] != 'updated':
+                self.stdout.write(f"  {db.name}: {summary['status']} ({summary['checked']} check)")
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f"✅ {db.name}: +{summary['inserted']} -{summary['deleted']} "
+                    f"({summary['unchanged']} unchanged, v{summary['data_version']})"
+                ))
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('🔄 Refreshing connected Google Sheets'))
+        while True:
+            self.refresh_all(options)
+            if options['interval'] <= 0:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,101 @@
+# Generated by Django 5.1 on 2026-10-17 02:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Frozen copy of api.row_store's native search index at this migration, so
+# later changes to that module can't change what the migration does
+FTS_TABLE = "api_connecteddatabaserow_fts"
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS api_cdbrow_search_trgm "
+            "ON api_connecteddatabaserow USING gin (search_text gin_trgm_ops)"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "search_text, content='api_connecteddatabaserow', content_rowid='id', tokenize='trigram')"
+        )
+        schema_editor.execute(
+            "CREATE TRIGGER IF NOT EXISTS api_cdbrow_fts_ai AFTER INSERT ON api_connecteddatabaserow BEGIN "
+            f"INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text); END"
+        )
+        schema_editor.execute(
+            "CREATE TRIGGER IF NOT EXISTS api_cdbrow_fts_ad AFTER DELETE ON api_connecteddatabaserow BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text); END"
+        )
+        schema_editor.execute(
+            "CREATE TRIGGER IF NOT EXISTS api_cdbrow_fts_au AFTER UPDATE ON api_connecteddatabaserow BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text); "
+            f"INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text); END"
+        )
+        schema_editor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS api_cdbrow_search_trgm")
+    elif vendor == 'sqlite':
+        for trigger in ('api_cdbrow_fts_ai', 'api_cdbrow_fts_ad', 'api_cdbrow_fts_au'):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def copy_data_to_rows(apps, schema_editor):
+    ConnectedDatabase = apps.get_model('api', 'ConnectedDatabase')
+    ConnectedDatabaseRow = apps.get_model('api', 'ConnectedDatabaseRow')
+    for db in ConnectedDatabase.objects.all():
+        ConnectedDatabaseRow.objects.bulk_create(
+            [
+                ConnectedDatabaseRow(
+                    database=db,
+                    data=row,
+                    search_text=" ".join(str(v).strip().lower() for v in row.values()),
+                )
+                for row in (db.data or [])
+            ],
+            batch_size=1000,
+        )
+
+
+def copy_rows_to_data(apps, schema_editor):
+    ConnectedDatabase = apps.get_model('api', 'ConnectedDatabase')
+    for db in ConnectedDatabase.objects.all():
+        db.data = list(db.rows.order_by('id').values_list('data', flat=True))
+        db.save(update_fields=['data'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_connecteddatabase_data_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConnectedDatabaseRow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.JSONField()),
+                ('search_text', models.TextField(blank=True, default='')),
+                ('database', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rows', to='api.connecteddatabase')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['database', 'id'], name='api_cdbrow_database_id_idx')],
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(copy_data_to_rows, copy_rows_to_data),
+        migrations.RemoveField(
+            model_name='connecteddatabase',
+            name='data',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-17 02:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_connecteddatabaserow'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='connecteddatabase',
+            name='search_engine',
+            field=models.CharField(choices=[('index', 'Hash Index'), ('columnar', 'Columnar Snapshot')], default='index', max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-17 02:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_connecteddatabaserow_phonetic_search_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='connecteddatabase',
+            name='display_columns',
+            field=models.JSONField(default=list),
+        ),
+    ]
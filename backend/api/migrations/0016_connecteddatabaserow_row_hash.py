@@ -0,0 +1,83 @@
+# Generated by Django 5.1 on 2026-10-17 02:35
+
+import hashlib
+import json
+import math
+from django.db import migrations, models
+
+# Frozen copies of api.row_store.row_hash and its native search index at
+# this migration, so later changes to that module can't change what it does
+FTS_TABLE = "api_connecteddatabaserow_fts"
+
+
+def _hash_cell(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def row_hash(row):
+    canonical = json.dumps({str(k): _hash_cell(v) for k, v in row.items()}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+def add_row_hashes(apps, schema_editor):
+    ConnectedDatabaseRow = apps.get_model('api', 'ConnectedDatabaseRow')
+    batch = []
+    for row in ConnectedDatabaseRow.objects.only('id', 'data').iterator(chunk_size=2000):
+        row.row_hash = row_hash(row.data)
+        batch.append(row)
+        if len(batch) >= 1000:
+            ConnectedDatabaseRow.objects.bulk_update(batch, ['row_hash'])
+            batch = []
+    if batch:
+        ConnectedDatabaseRow.objects.bulk_update(batch, ['row_hash'])
+
+
+def restore_search_index(apps, schema_editor):
+    # SQLite rebuilds the table to add the column, which drops the FTS triggers
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS api_cdbrow_search_trgm "
+            "ON api_connecteddatabaserow USING gin (search_text gin_trgm_ops)"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "search_text, content='api_connecteddatabaserow', content_rowid='id', tokenize='trigram')"
+        )
+        schema_editor.execute(
+            "CREATE TRIGGER IF NOT EXISTS api_cdbrow_fts_ai AFTER INSERT ON api_connecteddatabaserow BEGIN "
+            f"INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text); END"
+        )
+        schema_editor.execute(
+            "CREATE TRIGGER IF NOT EXISTS api_cdbrow_fts_ad AFTER DELETE ON api_connecteddatabaserow BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text); END"
+        )
+        schema_editor.execute(
+            "CREATE TRIGGER IF NOT EXISTS api_cdbrow_fts_au AFTER UPDATE ON api_connecteddatabaserow BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text); "
+            f"INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text); END"
+        )
+        schema_editor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_ingestionjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='connecteddatabaserow',
+            name='row_hash',
+            field=models.CharField(blank=True, default='', max_length=40),
+        ),
+        migrations.RunPython(restore_search_index, migrations.RunPython.noop),
+        migrations.RunPython(add_row_hashes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-17 02:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_connecteddatabaserow_row_hash'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='connecteddatabase',
+            name='search_engine',
+            field=models.CharField(choices=[('index', 'Hash Index'), ('columnar', 'Columnar Snapshot'), ('arrow', 'Arrow Snapshot')], default='index', max_length=20),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1 on 2026-10-17 02:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_connecteddatabase_arrow_search_engine'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchemaSummaryCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('prompt_kind', models.CharField(max_length=50)),
+                ('tool_name', models.CharField(max_length=255)),
+                ('summary', models.TextField()),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-17 02:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_schemasummarycache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='connecteddatabase',
+            name='column_profile',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1 on 2026-10-17 02:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_sheetwriteoutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='connecteddatabase',
+            name='rows_rewritten_version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
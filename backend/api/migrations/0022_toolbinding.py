@@ -0,0 +1,70 @@
+# Generated by Django 5.1 on 2026-10-17 02:56
+
+import re
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def sanitize_function_name(name):
+    """Frozen copy of api.vapi_service.sanitize_function_name at this migration"""
+    if not name:
+        return "function_1"
+    sanitized = re.sub(r'[^a-zA-Z0-9_-]', '', str(name))
+    sanitized = re.sub(r'^[_-]+', '', sanitized)
+    if not sanitized:
+        sanitized = "function_1"
+    sanitized = sanitized[:64]
+    if sanitized and sanitized[0] in ['_', '-']:
+        sanitized = 'f' + sanitized[1:]
+    return sanitized
+
+
+def bind_existing_tools(apps, schema_editor):
+    """Binds the tools recorded in vapi_tool_ids, naming them the way the connect paths did"""
+    ConnectedDatabase = apps.get_model('api', 'ConnectedDatabase')
+    ToolBinding = apps.get_model('api', 'ToolBinding')
+    seen = set()
+    for db in ConnectedDatabase.objects.order_by('id'):
+        sheet_name = db.name.lower().replace(' ', '_')
+        if db.source_type == 'googlesheets':
+            # Google Sheets datasets list the read tool (if any) before the write tool
+            tools = []
+            if not db.summary.startswith('Read: N/A'):
+                tools.append(('read', sanitize_function_name(f"search_{sheet_name}")))
+            if not db.summary.endswith('Write: N/A'):
+                tools.append(('write', sanitize_function_name(f"log_{sheet_name}")))
+        elif db.source_type == 'SUPABASE':
+            tools = [('read', sanitize_function_name(f"query_{db.name}"))]
+        else:
+            tools = [('read', sanitize_function_name(db.name))]
+        tool_ids = db.vapi_tool_ids or []
+        if len(tool_ids) != len(tools):
+            # A tool failed to create, so positions don't say which id is which; the
+            # tool-call handlers bind these on their first name-matched call instead
+            continue
+        for tool_id, (kind, function_name) in zip(tool_ids, tools):
+            if tool_id and tool_id not in seen:
+                seen.add(tool_id)
+                ToolBinding.objects.create(tool_id=tool_id, database=db, kind=kind, function_name=function_name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_connecteddatabase_rows_rewritten_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ToolBinding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tool_id', models.CharField(max_length=255, unique=True)),
+                ('kind', models.CharField(choices=[('read', 'Read'), ('write', 'Write')], max_length=10)),
+                ('function_name', models.CharField(db_index=True, max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('database', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tool_bindings', to='api.connecteddatabase')),
+            ],
+        ),
+        migrations.RunPython(bind_existing_tools, migrations.RunPython.noop),
+    ]
@@ -69,19 +69,154 @@ class KnowledgeDocument(models.Model):
         return self.file_name
 
 class ConnectedDatabase(models.Model):
+    SEARCH_ENGINE_CHOICES = [
+        ('index', 'Hash Index'),
+        ('columnar', 'Columnar Snapshot'), # NumPy arrays per column; for large, rarely-written datasets
+        ('arrow', 'Arrow Snapshot'), # Memory-mapped Arrow file shared by all workers; needs pyarrow
+    ]
+
     name = models.CharField(max_length=255)
     source_type = models.CharField(max_length=50) # 'csv' or 'excel'
     summary = models.TextField() # LLM-generated summary
     columns = models.JSONField() # List of column names
     vapi_tool_ids = models.JSONField(default=list) # Store the Vapi Tool IDs created
-    data = models.JSONField() # Store the actual row data for simplicity
     created_at = models.DateTimeField(auto_now_add=True)
     connection_details = models.JSONField(default=dict) # e.g., {"spreadsheet_id": "xyz"}
+    data_version = models.PositiveIntegerField(default=1) # Bumped on every change to its rows; keys search indexes
+    rows_rewritten_version = models.PositiveIntegerField(default=1) # data_version of the last change that was not an append; older indexes are rebuilt, newer ones delta-merged
+    search_engine = models.CharField(max_length=20, choices=SEARCH_ENGINE_CHOICES, default='index')
+    display_columns = models.JSONField(default=list) # Columns always returned to the assistant, besides matched and key columns
+    column_profile = models.JSONField(default=dict, blank=True) # Column name -> stats and index kind; see api/profiling.py
 
     def __str__(self):
         return f"{self.name} ({self.source_type})"
 
 
+class ConnectedDatabaseRow(models.Model):
+    """
+    One row of a connected dataset.
+    search_text backs the database-native search index (pg_trgm GIN on
+    Postgres, an FTS5 trigram table on SQLite); see api/row_store.py.
+    """
+
+    database = models.ForeignKey(ConnectedDatabase, on_delete=models.CASCADE, related_name='rows')
+    data = models.JSONField()
+    search_text = models.TextField(blank=True, default='') # Lower-cased cell values joined by spaces
+    row_hash = models.CharField(max_length=40, blank=True, default='') # SHA-1 of the row's content; see row_store.row_hash
+
+    class Meta:
+        ordering = ['id']
+        indexes = [models.Index(fields=['database', 'id'], name='api_cdbrow_database_id_idx')]
+
+    def __str__(self):
+        return f"{self.database.name} row {self.id}"
+
+
+class ToolBinding(models.Model):
+    """
+    Routes a Vapi tool to the dataset it answers for. Tool calls carry the
+    tool id, so routing is one unique-index lookup; see api/tool_routing.py.
+    """
+
+    KIND_CHOICES = [
+        ('read', 'Read'),
+        ('write', 'Write'),
+    ]
+
+    tool_id = models.CharField(max_length=255, unique=True) # Vapi tool ID
+    database = models.ForeignKey(ConnectedDatabase, on_delete=models.CASCADE, related_name='tool_bindings')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    function_name = models.CharField(max_length=64, db_index=True) # Sanitized function name the assistant calls
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.function_name} -> {self.database.name} ({self.kind})"
+
+
+class IngestionJob(models.Model):
+    """
+    One background run of a connect endpoint (file upload, Google Sheet or
+    Supabase table); see api/jobs.py. stage is the last completed stage and
+    stage_timings maps each completed stage to its duration in seconds.
+    """
+
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    source_type = models.CharField(max_length=50) # 'csv', 'excel', 'googlesheets' or 'supabase'
+    name = models.CharField(max_length=255, blank=True, default='') # File name, sheet name or table
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    stage = models.CharField(max_length=50, blank=True, default='') # e.g. 'parsed', 'summarized', 'tools_created', 'indexed'
+    stage_timings = models.JSONField(default=dict, blank=True)
+    result = models.JSONField(default=dict, blank=True) # What the connect endpoint used to return
+    error = models.TextField(blank=True, default='')
+    database = models.ForeignKey(
+        ConnectedDatabase, on_delete=models.SET_NULL, null=True, blank=True, related_name='ingestion_jobs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.source_type} job {self.id} ({self.status})"
+
+
+class SheetWriteOutbox(models.Model):
+    """
+    A row written by a sheet-write tool call, waiting to be appended to its
+    Google Sheet; see api/sheet_outbox.py. Entries are deleted once sent.
+    """
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('failed', 'Failed'),
+    ]
+
+    database = models.ForeignKey(ConnectedDatabase, on_delete=models.CASCADE, related_name='sheet_writes')
+    spreadsheet_id = models.CharField(max_length=255)
+    values = models.JSONField() # The row, in column order
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claim = models.CharField(max_length=32, blank=True, default='') # Token of the flush that is sending it
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [models.Index(fields=['status', 'next_attempt_at'], name='api_outbox_status_due_idx')]
+
+    def __str__(self):
+        return f"{self.spreadsheet_id} #{self.id} ({self.status})"
+
+
+class SchemaSummaryCache(models.Model):
+    """
+    Cached ToolMetadata from the Gemini dataset analysis, keyed by a hash of
+    (prompt kind, columns, sample rows, prompt text); see api/schema_cache.py.
+    """
+
+    key = models.CharField(max_length=64, unique=True) # SHA-256 hex digest
+    prompt_kind = models.CharField(max_length=50) # e.g. 'dataset', 'sql_table', 'sheet_read', 'sheet_write'
+    tool_name = models.CharField(max_length=255)
+    summary = models.TextField()
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.prompt_kind}: {self.tool_name}"
+
+
 class HumanExpert(models.Model):
     """Model to store human expert configurations for call transfers"""
     
@@ -0,0 +1,108 @@
+"""
+Phonetic and transliteration keys for voice-transcribed search queries.
+
+Speech transcription spells Indian names and places inconsistently
+("Sharma"/"Sarma", "Shrivastava"/"Srivastav") and sometimes in Devanagari.
+phonetic_keys() maps every word to a script-independent key so such
+variants collide on a cheap dictionary lookup:
+
+    phonetic_keys("Ravi Sharma") == phonetic_keys("रवि शर्मा") == ["ravi", "srm"]
+
+Keys are consonant skeletons, except for short words: two consonants
+alone ("dl" for both "Deli" and "Deol") collide far too often, so those
+keep their normalized vowels instead.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+
+# Devanagari consonants (inherent 'a' added during transliteration)
+CONSONANTS = {
+    'क': 'k', 'ख': 'kh', 'ग': 'g', 'घ': 'gh', 'ङ': 'n',
+    'च': 'ch', 'छ': 'chh', 'ज': 'j', 'झ': 'jh', 'ञ': 'n',
+    'ट': 't', 'ठ': 'th', 'ड': 'd', 'ढ': 'dh', 'ण': 'n',
+    'त': 't', 'थ': 'th', 'द': 'd', 'ध': 'dh', 'न': 'n',
+    'प': 'p', 'फ': 'ph', 'ब': 'b', 'भ': 'bh', 'म': 'm',
+    'य': 'y', 'र': 'r', 'ल': 'l', 'ळ': 'l', 'व': 'v',
+    'श': 'sh', 'ष': 'sh', 'स': 's', 'ह': 'h',
+}
+VOWELS = {
+    'अ': 'a', 'आ': 'aa', 'इ': 'i', 'ई': 'ii', 'उ': 'u', 'ऊ': 'uu',
+    'ऋ': 'ri', 'ए': 'e', 'ऐ': 'ai', 'ओ': 'o', 'औ': 'au',
+}
+MATRAS = {
+    'ा': 'aa', 'ि': 'i', 'ी': 'ii', 'ु': 'u', 'ू': 'uu', 'ृ': 'ri',
+    'े': 'e', 'ै': 'ai', 'ो': 'o', 'ौ': 'au',
+}
+MARKS = {'ं': 'n', 'ँ': 'n', 'ः': 'h', '्': '', '़': ''}
+DIGITS = {chr(0x0966 + i): str(i) for i in range(10)}
+
+# Applied in order to the lower-cased Latin form
+SPELLING_RULES = [(re.compile(pattern), replacement) for pattern, replacement in [
+    (r'ksh', 'x'),
+    (r'x', 'ks'),
+    (r'ph', 'f'),
+    (r'([bcdgjkt])h', r'\1'), # aspirates: bh, chh, dh, gh, jh, kh, th
+    (r'sh', 's'),
+    (r'ck', 'k'),
+    (r'q', 'k'),
+    (r'w', 'v'),
+    (r'z', 'j'),
+    (r'(?<=.)h', ''),         # remaining non-initial h is silent or an aspiration
+    (r'[eiy]', 'i'),
+    (r'[ou]', 'u'),
+    (r'(.)\1+', r'\1'),       # aa -> a, ii -> i, tt -> t
+]]
+NON_INITIAL_VOWELS = re.compile(r'(?<=.)[aiu]')
+WORDS = re.compile(r'[a-z0-9]+')
+MIN_TOKEN_LENGTH = 2
+# Consonant skeletons shorter than this keep their vowels
+MIN_SKELETON_LENGTH = 3
+
+
+def transliterate(text):
+    """Romanizes Devanagari and strips Latin diacritics (e.g. 'शर्मा' -> 'sharmaa')"""
+    text = str(text)
+    if text.isascii():
+        return text.lower()
+    out = []
+    pending_a = False
+    for char in text:
+        if char in MATRAS or char in MARKS:
+            pending_a = False
+            out.append(MATRAS.get(char, MARKS.get(char)))
+            continue
+        if pending_a:
+            out.append('a')
+            pending_a = False
+        if char in CONSONANTS:
+            out.append(CONSONANTS[char])
+            pending_a = True
+        else:
+            out.append(VOWELS.get(char) or DIGITS.get(char) or char)
+    if pending_a:
+        out.append('a')
+    folded = unicodedata.normalize('NFKD', "".join(out))
+    return "".join(c for c in folded if not unicodedata.combining(c)).lower()
+
+
+@lru_cache(maxsize=100000)
+def phonetic_key(word):
+    """Spelling-variant-insensitive key for one romanized word"""
+    if not word.isalpha():
+        return word
+    key = word
+    for pattern, replacement in SPELLING_RULES:
+        key = pattern.sub(replacement, key)
+    # Schwa deletion: 'Rama' / 'Ram', 'Sharma' / 'Sharm'
+    if len(key) > 2 and key.endswith('a'):
+        key = key[:-1]
+    # Drop non-initial vowels so 'Srivastava' / 'Shrivastav' / 'Srivastaw' agree
+    skeleton = NON_INITIAL_VOWELS.sub('', key)
+    return skeleton if len(skeleton) >= MIN_SKELETON_LENGTH else key
+
+
+def phonetic_keys(text):
+    """Phonetic keys of every word in text, in order (duplicates kept)"""
+    words = WORDS.findall(transliterate(text))
+    return [phonetic_key(word) for word in words if len(word) >= MIN_TOKEN_LENGTH]
@@ -0,0 +1,199 @@
+"""
+Per-column profiles of connected datasets, computed at ingest.
+
+ColumnProfiler sees every row once (it can wrap the row stream that is
+being stored) and records for each column: the inferred type, the number
+of distinct values, the null ratio, the average value length and the
+uniqueness (distinct / non-null). From those it picks the column's index:
+
+- 'skip':    empty columns; not searched at all. A search engine that
+             finds values in one (appended after profiling) searches it
+             fuzzily instead
+- 'numeric': integer / decimal columns; exact matches compare numbers, so
+             "42", "42.0" and 42 agree
+- 'exact':   identifier-like codes (unique, containing digits, no spaces)
+             and constant columns; exact and prefix matches only
+- 'fuzzy':   everything else, with the full fuzzy / phonetic treatment
+
+The profile is stored in ConnectedDatabase.column_profile and read by the
+search engines (see search_index) and by the LLM summary prompt.
+"""
+import math
+from datetime import date, datetime
+
+# Distinct values are counted exactly up to this many per column
+MAX_TRACKED_DISTINCT = 10000
+# Share of non-null values that must agree for a column type to be inferred
+TYPE_MAJORITY = 0.95
+EXACT_MIN_UNIQUENESS = 0.9
+EXAMPLES_PER_COLUMN = 2
+EXAMPLE_MAX_CHARS = 30
+
+
+def is_null(value):
+    return value is None or value == '' or (isinstance(value, float) and math.isnan(value))
+
+
+def value_type(value):
+    if isinstance(value, bool):
+        return 'boolean'
+    if isinstance(value, int):
+        return 'integer'
+    if isinstance(value, float):
+        return 'integer' if value.is_integer() else 'number'
+    if isinstance(value, (datetime, date)):
+        return 'datetime'
+    text = str(value).strip()
+    try:
+        number = float(text.replace(',', ''))
+    except ValueError:
+        return 'text'
+    if math.isnan(number) or math.isinf(number):
+        return 'text'
+    return 'integer' if number.is_integer() and '.' not in text else 'number'
+
+
+def normalize_number(value):
+    """Canonical text of a numeric value ('42.0' -> '42'), or None if it isn't one"""
+    if isinstance(value, bool):
+        return None
+    try:
+        number = float(str(value).strip().replace(',', ''))
+    except ValueError:
+        return None
+    if math.isnan(number) or math.isinf(number):
+        return None
+    return str(int(number)) if number.is_integer() else repr(number)
+
+
+class _ColumnStats:
+    __slots__ = ('count', 'nulls', 'distinct', 'capped', 'total_length', 'types', 'codes')
+
+    def __init__(self):
+        self.count = 0
+        self.nulls = 0
+        self.distinct = {} # value text -> occurrences, until capped
+        self.capped = False
+        self.total_length = 0
+        self.types = {}
+        self.codes = 0 # Values with a digit and no whitespace
+
+    def add(self, value):
+        self.count += 1
+        if is_null(value):
+            self.nulls += 1
+            return
+        text = str(value)
+        self.total_length += len(text)
+        kind = value_type(value)
+        self.types[kind] = self.types.get(kind, 0) + 1
+        if any(c.isdigit() for c in text) and not any(c.isspace() for c in text):
+            self.codes += 1
+        if text in self.distinct:
+            self.distinct[text] += 1
+        elif len(self.distinct) < MAX_TRACKED_DISTINCT:
+            self.distinct[text] = 1
+        else:
+            self.capped = True
+
+    def profile(self, row_count):
+        # Rows that lack the column altogether count as nulls
+        nulls = self.nulls + row_count - self.count
+        non_null = row_count - nulls
+        kind = 'empty'
+        if non_null:
+            kind, votes = max(self.types.items(), key=lambda item: item[1])
+            if kind == 'integer' and self.types.get('number'):
+                kind, votes = 'number', votes + self.types['number']
+            if votes < non_null * TYPE_MAJORITY:
+                kind = 'text'
+        distinct = len(self.distinct)
+        uniqueness = round(distinct / non_null, 3) if non_null else 0.0
+        if self.capped:
+            # Past the cap only a lower bound is known
+            uniqueness = max(uniqueness, round(MAX_TRACKED_DISTINCT / non_null, 3))
+        common = sorted(self.distinct.items(), key=lambda item: -item[1])[:EXAMPLES_PER_COLUMN]
+        return {
+            'type': kind,
+            'distinct': distinct,
+            'distinct_capped': self.capped,
+            'null_ratio': round(nulls / row_count, 3) if row_count else 1.0,
+            'avg_length': round(self.total_length / non_null, 1) if non_null else 0.0,
+            'uniqueness': uniqueness,
+            'examples': [text[:EXAMPLE_MAX_CHARS] for text, _ in common],
+            'index': _index_kind(kind, distinct, non_null, uniqueness, self.codes),
+        }
+
+
+def _index_kind(kind, distinct, non_null, uniqueness, codes):
+    if kind == 'empty':
+        return 'skip'
+    if kind in ('integer', 'number'):
+        return 'numeric'
+    if distinct <= 1 and non_null > 1:
+        # Constant ("Delhi" on every row): still asked for by value, no fuzzy corpus needed
+        return 'exact'
+    if kind == 'text' and uniqueness >= EXACT_MIN_UNIQUENESS and codes >= non_null * TYPE_MAJORITY:
+        return 'exact'
+    return 'fuzzy'
+
+
+class ColumnProfiler:
+    """Accumulates column statistics over a stream of row dicts"""
+
+    def __init__(self):
+        self.row_count = 0
+        self.columns = {}
+
+    def add(self, row):
+        self.row_count += 1
+        for column, value in row.items():
+            stats = self.columns.get(column)
+            if stats is None:
+                stats = self.columns[column] = _ColumnStats()
+            stats.add(value)
+
+    def track(self, rows):
+        """Yields rows unchanged, profiling them on the way (e.g. while they are stored)"""
+        for row in rows:
+            self.add(row)
+            yield row
+
+    def profile(self):
+        return {str(column): stats.profile(self.row_count) for column, stats in self.columns.items()}
+
+
+def profile_rows(rows):
+    profiler = ColumnProfiler()
+    for row in rows:
+        profiler.add(row)
+    return profiler.profile()
+
+
+def index_plan(profile):
+    """column -> index kind; columns missing from the profile are searched fuzzily"""
+    return {column: stats.get('index', 'fuzzy') for column, stats in (profile or {}).items()}
+
+
+def describe_columns(profile):
+    """
+    Compact column description for the LLM summary prompt, e.g.
+    "ward (text, 12 distinct, e.g. 'Rohini', 'Narela'); complaint_id (unique ID, e.g. 'CMP-00000', 'CMP-00001')".
+    Skipped columns are left out.
+    """
+    parts = []
+    for column, stats in profile.items():
+        if stats['index'] == 'skip':
+            continue
+        if stats['index'] == 'exact' and stats['distinct'] > 1:
+            detail = 'unique ID'
+        elif stats['uniqueness'] >= EXACT_MIN_UNIQUENESS:
+            detail = f"{stats['type']}, unique"
+        else:
+            distinct = f"{stats['distinct']}+" if stats['distinct_capped'] else stats['distinct']
+            detail = f"{stats['type']}, {distinct} distinct"
+        if stats['null_ratio'] >= 0.5:
+            detail += f", {round(stats['null_ratio'] * 100)}% empty"
+        examples = ", ".join(repr(example) for example in stats['examples'])
+        parts.append(f"{column} ({detail}, e.g. {examples})" if examples else f"{column} ({detail})")
+    return "; ".join(parts)
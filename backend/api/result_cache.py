@@ -0,0 +1,130 @@
+"""
+Per-worker cache of execute_db_query results.
+
+Callers ask about the same wards, schemes and IDs again and again, so
+shaped tool results are cached under (database id, data_version,
+normalized query, normalized target column). A sheet write bumps
+data_version, so every worker stops hitting the old entries at once; the
+writing worker also drops them right away to free memory.
+
+Concurrent identical lookups are coalesced: the first caller computes the
+result and the others wait for it instead of repeating the search.
+"""
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from .search_index import normalize_column, normalize_value
+
+
+class _Flight:
+    """One in-progress computation that identical lookups wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResultCache:
+    """TTL + LRU cache of tool results with single-flight computation"""
+
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict() # key -> (expires_at, value)
+        self.in_flight = {} # key -> _Flight
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def make_key(db_record, search_query, target_column=''):
+        return (db_record.id, db_record.data_version, normalize_value(search_query), normalize_column(target_column))
+
+    def get_or_compute(self, key, compute):
+        """
+        Returns the cached value for key, or computes it. compute() returns
+        (value, cacheable); uncacheable values are still shared with the
+        callers that were waiting on this computation.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self.hits += 1
+                    self.entries.move_to_end(key)
+                    return entry[1]
+                del self.entries[key]
+            flight = self.in_flight.get(key)
+            leader = flight is None
+            if leader:
+                self.misses += 1
+                flight = self.in_flight[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            value, cacheable = compute()
+            flight.value = value
+            if cacheable and self.ttl_seconds > 0:
+                self._store(key, value)
+            return value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                self.in_flight.pop(key, None)
+            flight.done.set()
+
+    def _store(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, db_id):
+        """Drops every cached result for db_id"""
+        with self.lock:
+            for key in [k for k in self.entries if k[0] == db_id]:
+                del self.entries[key]
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.coalesced) / lookups, 3) if lookups else None,
+            }
+
+
+_cache = ResultCache(settings.RESULT_CACHE_MAX_ENTRIES, settings.RESULT_CACHE_TTL_SECONDS)
+
+
+def get_or_compute(db_record, search_query, target_column, compute):
+    return _cache.get_or_compute(ResultCache.make_key(db_record, search_query, target_column), compute)
+
+
+def invalidate(db_id):
+    _cache.invalidate(db_id)
+
+
+def cache_stats():
+    return _cache.stats()
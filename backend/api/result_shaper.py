@@ -0,0 +1,188 @@
+"""
+Shapes execute_db_query results before they go back to Vapi.
+
+The assistant's LLM reads every byte of a tool result on its next turn, so
+wide rows cost latency. Rows of wide datasets are projected to the columns
+that matter: the column(s) the query matched, key identifier columns
+(id / name / phone ...) and the database's configured display_columns.
+Every payload is then held to settings.TOOL_RESULT_MAX_BYTES: long values
+are clipped and the weakest rows dropped; a single row still over budget
+loses its other columns, then its values are clipped further, then its
+key and matched columns go too.
+"""
+import json
+import re
+import threading
+from django.conf import settings
+from rapidfuzz import fuzz, utils as fuzz_utils
+from .search_index import normalize_column, normalize_value
+
+# Column names (lower snake_case, see _key_name) treated as row identifiers;
+# short words only count between separators, so 'paid' or 'namespace' don't
+KEY_COLUMN_PATTERN = re.compile(
+    r'((^|_)id$|(^|_)name(_|$)|name$|(^|_)(phone|mobile|contact)|(^|_)no$|number$|code$)'
+)
+MATCH_SCORE_CUTOFF = 80
+TRUNCATION_MARK = "…"
+MIN_VALUE_CHARS = 16
+
+
+class PayloadStats:
+    """
+    Thread-safe counters for the tool result payloads this worker emitted.
+    Sizes count every payload sent, result-cache hits included; projected
+    and truncated count the searches whose result was shaped.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_bytes = 0
+        self.max_bytes = 0
+        self.shaped = 0
+        self.projected = 0
+        self.truncated = 0
+
+    def record_shaped(self, projected, truncated):
+        with self._lock:
+            self.shaped += 1
+            self.projected += int(projected)
+            self.truncated += int(truncated)
+
+    def record_sent(self, size):
+        with self._lock:
+            self.count += 1
+            self.total_bytes += size
+            self.max_bytes = max(self.max_bytes, size)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'results': self.count,
+                'avg_bytes': round(self.total_bytes / self.count, 1) if self.count else 0,
+                'max_bytes': self.max_bytes,
+                'shaped': self.shaped,
+                'projected': self.projected,
+                'truncated': self.truncated,
+                'max_bytes_budget': settings.TOOL_RESULT_MAX_BYTES,
+            }
+
+
+_stats = PayloadStats()
+
+
+def payload_size(payload):
+    return len(json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8'))
+
+
+def _key_name(column):
+    """'CustomerID' / 'customer-id' / 'Customer ID' -> 'customer_id'"""
+    name = re.sub(r'([a-z0-9])([A-Z])', r'\1_\2', str(column))
+    return re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')
+
+
+def key_columns(columns):
+    return [column for column in columns if KEY_COLUMN_PATTERN.search(_key_name(column))]
+
+
+def matched_columns(row, search_query):
+    """Columns of row whose value matches search_query exactly or closely"""
+    query = normalize_value(search_query)
+    processed_query = fuzz_utils.default_process(search_query)
+    matched = []
+    for column, value in row.items():
+        if normalize_value(value) == query:
+            matched.append(column)
+        elif processed_query and fuzz.partial_ratio(
+            processed_query, str(value), processor=fuzz_utils.default_process, score_cutoff=MATCH_SCORE_CUTOFF
+        ):
+            matched.append(column)
+    return matched
+
+
+def project_row(row, keep):
+    return {column: value for column, value in row.items() if column in keep}
+
+
+def _truncate_values(row, max_chars):
+    return {
+        column: value[:max_chars] + TRUNCATION_MARK if isinstance(value, str) and len(value) > max_chars else value
+        for column, value in row.items()
+    }
+
+
+def shape_result(db_record, final_data, search_query, target_column=''):
+    """
+    Projects and budgets a run_search payload for db_record.
+    Returns the payload to send; the original is left untouched.
+    """
+    rows = final_data.get('results') or []
+    shaped = dict(final_data)
+    projected = False
+
+    if rows and len(db_record.columns or []) > settings.TOOL_RESULT_PROJECT_ABOVE_COLUMNS:
+        # Narrow datasets are cheap enough to return whole
+        base = set(key_columns(db_record.columns)) | set(db_record.display_columns or [])
+        target = normalize_column(target_column)
+        if target:
+            base |= {column for column in db_record.columns if normalize_column(column) == target}
+        projected_rows = []
+        for row in rows:
+            keep = base | set(matched_columns(row, search_query))
+            projected_rows.append(project_row(row, keep) if keep else row)
+        projected = any(len(p) < len(r) for p, r in zip(projected_rows, rows))
+        shaped['results'] = projected_rows
+
+    # Budget: clip long cell values first, then drop the weakest (last) rows
+    truncated = False
+    budget = settings.TOOL_RESULT_MAX_BYTES
+    if payload_size(shaped) > budget:
+        truncated = True
+        # Markers are set before measuring: they count against the budget too
+        shaped['truncated'] = True
+        shaped['results'] = [_truncate_values(row, settings.TOOL_RESULT_MAX_VALUE_CHARS) for row in shaped['results']]
+        total = len(shaped['results'])
+        while len(shaped['results']) > 1 and payload_size(shaped) > budget:
+            shaped['results'] = shaped['results'][:-1]
+            shaped['omitted_results'] = total - len(shaped['results'])
+        if shaped['results'] and payload_size(shaped) > budget:
+            _fit_single_row(shaped, search_query, budget)
+
+    _stats.record_shaped(projected, truncated)
+    return shaped
+
+
+def _fit_single_row(shaped, search_query, budget):
+    """Shrinks the one row left in shaped until the payload fits the budget"""
+    row = shaped['results'][0]
+    kept = set(key_columns(row)) | set(matched_columns(row, search_query))
+    columns = len(row)
+
+    def _fits(candidate):
+        shaped['results'] = [candidate]
+        if len(candidate) < columns:
+            shaped['omitted_columns'] = columns - len(candidate)
+        return payload_size(shaped) <= budget
+
+    # 1. Columns that are neither keys nor matched, last first
+    for column in reversed([column for column in row if column not in kept]):
+        row = {name: value for name, value in row.items() if name != column}
+        if _fits(row):
+            break
+    # 2. Shorter values
+    max_chars = settings.TOOL_RESULT_MAX_VALUE_CHARS
+    while not _fits(_truncate_values(row, max_chars)) and max_chars > MIN_VALUE_CHARS:
+        max_chars //= 2
+    # 3. Whatever is left, last column first
+    row = shaped['results'][0]
+    while not _fits(row) and row:
+        row = dict(list(row.items())[:-1])
+
+
+def record_sent(payload):
+    """Counts a payload that went back to Vapi (computed or from the result cache)"""
+    _stats.record_sent(payload_size(payload))
+
+
+def payload_stats():
+    return _stats.stats()
@@ -0,0 +1,180 @@
+"""
+Row-table storage for connected datasets.
+
+Rows live in ConnectedDatabaseRow, one record per dataset row, so tool
+calls and sheet writes never (de)serialize a whole dataset. Each row
+carries a lower-cased search_text that the database indexes natively:
+- Postgres: pg_trgm GIN index, queried with ILIKE / word similarity
+- SQLite:   external-content FTS5 table with the trigram tokenizer
+search_text also carries the row's phonetic keys, so the native index can
+recover transliterated and misspelled voice queries too. row_hash
+fingerprints the row's content for incremental sheet refreshes.
+"""
+import hashlib
+import json
+import math
+from django.db import connection
+from django.db.models import Max
+from .models import ConnectedDatabaseRow
+from .phonetics import phonetic_keys
+from . import search_index
+
+INSERT_BATCH_SIZE = 1000
+FTS_TABLE = "api_connecteddatabaserow_fts"
+
+
+def row_search_text(row):
+    values = " ".join(search_index.normalize_value(v) for v in row.values())
+    return f"{values} {' '.join(sorted(set(phonetic_keys(values))))}".strip()
+
+
+def _hash_cell(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        # pandas reads integer columns with blanks as floats: 12 and 12.0 are the same cell
+        return str(int(value))
+    return str(value).strip()
+
+
+def row_hash(row):
+    """Content fingerprint of a row, stable across CSV re-reads and sheet writes"""
+    canonical = json.dumps({str(k): _hash_cell(v) for k, v in row.items()}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+def json_safe(row):
+    """Blank cells come from pandas as NaN, which JSON columns reject; store them as null"""
+    return {k: None if isinstance(v, float) and not math.isfinite(v) else v for k, v in row.items()}
+
+
+def make_row(db_record, row):
+    return ConnectedDatabaseRow(
+        database=db_record, data=json_safe(row), search_text=row_search_text(row), row_hash=row_hash(row)
+    )
+
+
+def insert_rows(db_record, rows, batch_size=INSERT_BATCH_SIZE):
+    """Bulk-inserts an iterable of row dicts for db_record. Returns the number of rows written."""
+    batch = []
+    count = 0
+    for row in rows:
+        batch.append(make_row(db_record, row))
+        if len(batch) >= batch_size:
+            ConnectedDatabaseRow.objects.bulk_create(batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        ConnectedDatabaseRow.objects.bulk_create(batch)
+        count += len(batch)
+    return count
+
+
+def append_row(db_record, row):
+    record = make_row(db_record, row)
+    record.save()
+    return record
+
+
+def load_rows(db_record):
+    """Returns every row of db_record in insertion order"""
+    return list(
+        ConnectedDatabaseRow.objects.filter(database=db_record)
+        .order_by('id').values_list('data', flat=True).iterator(chunk_size=2000)
+    )
+
+
+def rows_after(db_record, after_id):
+    """Returns (row id, row) pairs of db_record with ids above after_id, in insertion order"""
+    return list(
+        ConnectedDatabaseRow.objects.filter(database=db_record, id__gt=after_id)
+        .order_by('id').values_list('id', 'data').iterator(chunk_size=2000)
+    )
+
+
+def last_row_id(db_record):
+    """Highest row id of db_record, 0 if it has no rows"""
+    return ConnectedDatabaseRow.objects.filter(database=db_record).aggregate(last=Max('id'))['last'] or 0
+
+
+def candidate_rows(db_record, query, limit=200):
+    """
+    Uses the database-native search index to fetch at most `limit` rows that
+    plausibly match query, best first. Callers re-score them in Python.
+    """
+    query = search_index.normalize_value(query)
+    if not query:
+        return []
+    keys = sorted(set(phonetic_keys(query)))
+
+    if connection.vendor == 'postgresql':
+        like = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        sql = (
+            "SELECT id FROM api_connecteddatabaserow "
+            "WHERE database_id = %s AND (search_text LIKE %s OR %s <%% search_text OR %s <%% search_text) "
+            "ORDER BY word_similarity(%s, search_text) DESC LIMIT %s"
+        )
+        params = [db_record.id, like, query, " ".join(keys) or query, query, limit]
+    elif connection.vendor == 'sqlite' and len(query) >= 3:
+        # Trigram tokens: the full phrase ranks substring hits first, the
+        # individual trigrams recover misspellings
+        trigrams = {query[i:i + 3] for i in range(len(query) - 2)}
+        terms = [query] + [key for key in keys if len(key) >= 3] + sorted(trigrams)[:32]
+        match = " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+        sql = (
+            f"SELECT r.id FROM {FTS_TABLE} f JOIN api_connecteddatabaserow r ON r.id = f.rowid "
+            f"WHERE {FTS_TABLE} MATCH %s AND r.database_id = %s ORDER BY f.rank LIMIT %s"
+        )
+        params = [match, db_record.id, limit]
+    else:
+        # Queries too short for trigrams: let the database scan, not Python
+        return list(
+            ConnectedDatabaseRow.objects.filter(database=db_record, search_text__contains=query)
+            .order_by('id').values_list('data', flat=True)[:limit]
+        )
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        ids = [row[0] for row in cursor.fetchall()]
+    data_by_id = dict(ConnectedDatabaseRow.objects.filter(id__in=ids).values_list('id', 'data'))
+    return [data_by_id[row_id] for row_id in ids if row_id in data_by_id]
+
+
+def create_native_search_index(schema_editor):
+    """Creates the vendor-specific search index over ConnectedDatabaseRow.search_text (idempotent)"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS api_cdbrow_search_trgm "
+            "ON api_connecteddatabaserow USING gin (search_text gin_trgm_ops)"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "search_text, content='api_connecteddatabaserow', content_rowid='id', tokenize='trigram')"
+        )
+        schema_editor.execute(
+            "CREATE TRIGGER IF NOT EXISTS api_cdbrow_fts_ai AFTER INSERT ON api_connecteddatabaserow BEGIN "
+            f"INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text); END"
+        )
+        schema_editor.execute(
+            "CREATE TRIGGER IF NOT EXISTS api_cdbrow_fts_ad AFTER DELETE ON api_connecteddatabaserow BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text); END"
+        )
+        schema_editor.execute(
+            "CREATE TRIGGER IF NOT EXISTS api_cdbrow_fts_au AFTER UPDATE ON api_connecteddatabaserow BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text); "
+            f"INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text); END"
+        )
+        schema_editor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def drop_native_search_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS api_cdbrow_search_trgm")
+    elif vendor == 'sqlite':
+        for trigger in ('api_cdbrow_fts_ai', 'api_cdbrow_fts_ad', 'api_cdbrow_fts_au'):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
@@ -0,0 +1,58 @@
+"""
+Persistent cache of Gemini dataset analyses (ToolMetadata).
+
+Reconnecting the same file or sheet (same name, schema and data) used to
+pay a fresh Gemini round trip. analyze() keys each structured-output call
+by a hash of (prompt kind, columns, sample rows, prompt text) and answers
+repeats from SchemaSummaryCache, as long as the entry is younger than
+settings.SCHEMA_SUMMARY_CACHE_MAX_AGE_DAYS. bypass=True always asks the LLM
+and refreshes the entry.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F
+from django.utils import timezone
+from .models import SchemaSummaryCache
+from .structured_output import ToolMetadata
+
+
+def schema_key(prompt_kind, columns, sample, prompt):
+    # The prompt carries the file/sheet name and column profile, which shape the answer too
+    payload = json.dumps([prompt_kind, [str(column) for column in columns], str(sample), prompt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def analyze(prompt_kind, columns, sample, prompt, invoke_llm, bypass=False):
+    """
+    Returns ToolMetadata for a dataset schema. invoke_llm(prompt) performs
+    the structured-output call on a cache miss; its exceptions propagate and
+    nothing is cached.
+    """
+    key = schema_key(prompt_kind, columns, sample, prompt)
+    max_age = timedelta(days=settings.SCHEMA_SUMMARY_CACHE_MAX_AGE_DAYS)
+
+    if not bypass:
+        entry = SchemaSummaryCache.objects.filter(key=key, created_at__gte=timezone.now() - max_age).first()
+        if entry is not None:
+            SchemaSummaryCache.objects.filter(pk=entry.pk).update(hits=F('hits') + 1, last_used_at=timezone.now())
+            print(f"🧠 Schema summary cache hit ({prompt_kind}): {entry.tool_name}")
+            return ToolMetadata(tool_name=entry.tool_name, summary=entry.summary)
+
+    metadata = invoke_llm(prompt)
+    _store(key, prompt_kind, metadata)
+    return metadata
+
+
+def _store(key, prompt_kind, metadata):
+    # Plain autocommit statements rather than update_or_create: its transaction
+    # deadlocks on SQLite when the read and write analyses of a sheet finish together
+    fields = {'prompt_kind': prompt_kind, 'tool_name': metadata.tool_name, 'summary': metadata.summary}
+    if SchemaSummaryCache.objects.filter(key=key).update(**fields, hits=0, created_at=timezone.now()):
+        return
+    try:
+        SchemaSummaryCache.objects.create(key=key, **fields)
+    except IntegrityError: # Stored concurrently by another ingestion
+        pass
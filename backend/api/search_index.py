@@ -0,0 +1,788 @@
+"""
+In-process search indexes for ConnectedDatabase rows.
+
+Each worker keeps an LRU cache of indexes, one per database, tagged with
+the data_version they reflect and a watermark: the highest row id they
+hold. Rows are only ever appended between rewrites, so an index that is
+behind catches up by appending the rows above its watermark (a delta
+merge), whichever worker wrote them. Only a rewrite (deleted rows, changed
+columns or search settings; see ConnectedDatabase.rows_rewritten_version)
+needs a rebuild. Ingest endpoints warm the cache. A worker holding no
+usable index answers from the database's own search index (see row_store)
+while it rebuilds its in-memory index in the background.
+"""
+import math
+import re
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+import numpy as np
+from django.conf import settings
+from django.db import connection
+from rapidfuzz import process, fuzz, utils as fuzz_utils
+from . import arrow_store, profiling, row_store
+from .phonetics import phonetic_keys, transliterate
+
+
+def normalize_value(value):
+    """Normalizes a cell value or search query for exact matching"""
+    return str(value).strip().lower()
+
+
+def normalize_column(name):
+    """Normalizes a column name so 'Phone Number', 'phone_number' and 'PHONE-NUMBER' agree"""
+    return re.sub(r'[^a-z0-9]+', '', str(name).lower())
+
+
+class TrigramIndex:
+    """
+    Inverted index of character trigrams -> row ids over the processed row
+    strings. Shortlists rows that share enough trigrams with a query so
+    rapidfuzz only scores those. Postings are uint32 arrays and grow on append.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.row_count = 0
+        self.size_bytes = 0
+
+    @staticmethod
+    def trigrams(text):
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def add(self, row_id, text):
+        added_bytes = 0
+        for gram in self.trigrams(text):
+            posting = self.postings.get(gram)
+            if posting is None:
+                posting = self.postings[gram] = array('I')
+                added_bytes += sys.getsizeof(gram) + sys.getsizeof(posting)
+            posting.append(row_id)
+            added_bytes += posting.itemsize
+        self.row_count = max(self.row_count, row_id + 1)
+        self.size_bytes += added_bytes
+
+    def candidates(self, processed_query, max_candidates, min_overlap):
+        """
+        Returns ascending row ids sharing at least `min_overlap` of the
+        query's trigrams (the best `max_candidates` of them), or None when the
+        query is too short to have trigrams.
+        """
+        grams = self.trigrams(processed_query)
+        if not grams:
+            return None
+        # tobytes() copies, so a concurrent append never hits an exported buffer
+        postings = [
+            np.frombuffer(self.postings[gram].tobytes(), dtype=np.uint32)
+            for gram in grams if gram in self.postings
+        ]
+        if not postings:
+            return np.empty(0, dtype=np.int64)
+        counts = np.bincount(np.concatenate(postings), minlength=self.row_count)
+        hits = np.flatnonzero(counts >= max(1, math.ceil(len(grams) * min_overlap)))
+        if len(hits) > max_candidates:
+            hits = np.sort(hits[np.argpartition(counts[hits], -max_candidates)[-max_candidates:]])
+        return hits
+
+
+class PhoneticIndex:
+    """
+    Phonetic/transliteration key -> row ids (see api/phonetics.py), so
+    misspelled or Devanagari voice queries resolve by key lookup instead of
+    a full fuzzy scan. A row matches when it holds every key of the query;
+    matches are scored by partial_ratio on their romanized text or key
+    sequence, and those below SCORE_CUTOFF are dropped so the fuzzy pass can
+    answer instead.
+    """
+
+    SCORE_CUTOFF = 70
+
+    def __init__(self):
+        self.postings = {}
+        self.size_bytes = 0
+
+    def add(self, row_id, row):
+        added_bytes = 0
+        for key in set(phonetic_keys(" ".join(str(v) for v in row.values()))):
+            posting = self.postings.get(key)
+            if posting is None:
+                posting = self.postings[key] = array('I')
+                added_bytes += sys.getsizeof(key) + sys.getsizeof(posting)
+            posting.append(row_id)
+            added_bytes += posting.itemsize
+        self.size_bytes += added_bytes
+
+    def lookup(self, rows, corpus, query, column=None, limit=3):
+        """Rows holding every query key (in column, if given), best partial_ratio first"""
+        keys = set(phonetic_keys(query))
+        if not keys or any(key not in self.postings for key in keys):
+            return []
+        # Postings are ascending and unique per key, so intersect the smallest first
+        row_ids = None
+        for key in sorted(keys, key=lambda k: len(self.postings[k])):
+            ids = np.frombuffer(self.postings[key].tobytes(), dtype=np.uint32)
+            row_ids = ids if row_ids is None else np.intersect1d(row_ids, ids, assume_unique=True)
+            if not len(row_ids):
+                return []
+        row_ids = [int(i) for i in row_ids]
+        if column:
+            row_ids = [i for i in row_ids if keys <= set(phonetic_keys(rows[i].get(column, "")))]
+        # Every candidate is scored, not just the lowest ids. The score is the better of the
+        # romanized text's and the key sequence's similarity ('laxmi' / 'Lakshmi' agree only
+        # on keys); text similarity breaks ties.
+        processed_query = fuzz_utils.default_process(transliterate(query))
+        query_keys = " ".join(phonetic_keys(query))
+        scored = []
+        for i in row_ids:
+            text = corpus[i]
+            if not text.isascii():
+                text = fuzz_utils.default_process(transliterate(" ".join(str(v) for v in rows[i].values())))
+            text_score = fuzz.partial_ratio(processed_query, text)
+            score = text_score
+            if score < self.SCORE_CUTOFF:
+                score = max(score, fuzz.partial_ratio(query_keys, " ".join(phonetic_keys(text))))
+            if score >= self.SCORE_CUTOFF:
+                scored.append((score, text_score, -i))
+        scored.sort(reverse=True)
+        return [rows[-neg_id] for _, _, neg_id in scored[:limit]]
+
+
+class DatasetIndex:
+    """
+    Search structures for one connected dataset:
+    - exact: normalized value -> row ids
+    - corpus: each row joined and run through rapidfuzz's default_process
+    - column_exact / column_corpus: the same, restricted to a single column
+    - trigrams: trigram -> row ids over corpus, the fuzzy-search prefilter
+    - phonetics: phonetic/transliteration key -> row ids
+
+    With a column profile (see api/profiling.py), 'skip' columns are left
+    out entirely, 'exact' and 'numeric' columns get no column corpus, and
+    numeric values are also keyed by their canonical number. A 'skip'
+    column that an appended row fills is indexed as 'fuzzy' from then on.
+    """
+
+    supports_append = True
+
+    def __init__(self, rows, profile=None):
+        self.rows = []
+        self.exact = {}
+        self.corpus = []
+        self.columns = {} # normalized column name -> column name
+        self.column_exact = {}
+        self.column_corpus = {}
+        self.plan = profiling.index_plan(profile)
+        self.trigrams = TrigramIndex()
+        self.phonetics = PhoneticIndex()
+        self.base_bytes = 0
+        for row in rows:
+            self.add_row(row)
+
+    @property
+    def size_bytes(self):
+        return self.base_bytes + self.trigrams.size_bytes + self.phonetics.size_bytes
+
+    def _add_column(self, column):
+        self.columns[normalize_column(column)] = column
+        self.column_exact[column] = {}
+        if self.plan.get(column, 'fuzzy') == 'fuzzy':
+            # Rows indexed before this column appeared have no value for it
+            self.column_corpus[column] = [""] * len(self.corpus)
+
+    def _add_key(self, key, column, row_id):
+        added_bytes = 0
+        row_ids = self.exact.get(key)
+        if row_ids is None:
+            row_ids = self.exact[key] = []
+            added_bytes += sys.getsizeof(key)
+        # A row can hold the same value in several columns
+        if not row_ids or row_ids[-1] != row_id:
+            row_ids.append(row_id)
+        column_ids = self.column_exact[column].setdefault(key, [])
+        if not column_ids or column_ids[-1] != row_id:
+            column_ids.append(row_id)
+        return added_bytes
+
+    def add_row(self, row):
+        row_id = len(self.rows)
+        self.rows.append(row)
+        added_bytes = sys.getsizeof(row)
+        searchable = {}
+        for column, value in row.items():
+            if column not in self.column_exact:
+                self._add_column(column)
+            kind = self.plan.get(column, 'fuzzy')
+            if kind == 'skip':
+                if profiling.is_null(value):
+                    continue
+                # Profiled empty, but this row fills it: earlier rows have no value, so no rebuild is needed
+                kind = self.plan[column] = 'fuzzy'
+                self.column_corpus[column] = [""] * len(self.corpus)
+            searchable[column] = value
+            key = normalize_value(value)
+            added_bytes += self._add_key(key, column, row_id)
+            if kind == 'numeric':
+                number = profiling.normalize_number(value)
+                if number is not None and number != key:
+                    added_bytes += self._add_key(number, column, row_id)
+            if kind == 'fuzzy':
+                cell_string = fuzz_utils.default_process(str(value))
+                self.column_corpus[column].append(cell_string)
+                added_bytes += sys.getsizeof(cell_string)
+            added_bytes += sys.getsizeof(value)
+        for column, cells in self.column_corpus.items():
+            if column not in searchable:
+                cells.append("")
+        row_string = fuzz_utils.default_process(" ".join(str(v) for v in searchable.values()))
+        self.corpus.append(row_string)
+        self.trigrams.add(row_id, row_string)
+        self.phonetics.add(row_id, searchable)
+        self.base_bytes += added_bytes + sys.getsizeof(row_string)
+
+    def resolve_column(self, target_column):
+        """Maps an LLM-supplied column name to a real column, or None"""
+        if not target_column:
+            return None
+        return self.columns.get(normalize_column(target_column))
+
+    def exact_lookup(self, query, column=None):
+        """Returns the first row whose value (in column, if given) equals the query, or None"""
+        exact = self.column_exact[column] if column else self.exact
+        row_ids = exact.get(normalize_value(query))
+        if not row_ids and (column is None or self.plan.get(column) == 'numeric'):
+            # "42.0" finds 42 in numeric columns
+            number = profiling.normalize_number(query)
+            row_ids = exact.get(number) if number is not None else None
+        if not row_ids:
+            return None
+        return self.rows[row_ids[0]]
+
+    def prefix_lookup(self, query, column=None, limit=3):
+        """Hash indexes leave prefix matches to the fuzzy pass"""
+        return []
+
+    def phonetic_lookup(self, query, column=None, limit=3):
+        return self.phonetics.lookup(self.rows, self.corpus, query, column, limit)
+
+    def fuzzy_search(self, query, limit=3, score_cutoff=60, column=None):
+        """Returns up to `limit` rows ranked by partial_ratio against the corpus (or one column)"""
+        if column and column not in self.column_corpus:
+            return [] # Exact-only column: the whole-row pass takes over
+        corpus = self.column_corpus[column] if column else self.corpus
+        return _fuzzy_rows(self.rows, corpus, query, limit, score_cutoff, self.trigrams)
+
+
+class ColumnarSnapshot:
+    """
+    Read-only columnar view of a large connected dataset: one NumPy unicode
+    array per column, stringified and lower-cased once, so exact and prefix
+    matching are vectorized comparisons instead of loops over row dicts.
+    Appends are not applied in place; the snapshot is rebuilt instead.
+    """
+
+    supports_append = False
+    MIN_PREFIX_LENGTH = 3
+
+    def __init__(self, rows, profile=None):
+        self.rows = list(rows)
+        plan = profiling.index_plan(profile)
+        names = {}
+        for row in self.rows:
+            for column in row:
+                names.setdefault(column, None)
+        self.columns = {normalize_column(column): column for column in names}
+        # Profiled empty columns are not searched, unless rows stored since fill them;
+        # see DatasetIndex for the other index kinds
+        for column in [column for column in names if plan.get(column) == 'skip']:
+            if any(not profiling.is_null(row.get(column)) for row in self.rows):
+                plan[column] = 'fuzzy'
+        names = [column for column in names if plan.get(column) != 'skip']
+        self.numeric = {column for column in names if plan.get(column) == 'numeric'}
+        self.arrays = {
+            column: np.array([normalize_value(row.get(column, "")) for row in self.rows], dtype=str)
+            for column in names
+        }
+        # Numeric columns also get their canonical numbers, so "42.0" finds 42
+        self.number_arrays = {
+            column: np.array([profiling.normalize_number(row.get(column, "")) or "" for row in self.rows], dtype=str)
+            for column in self.numeric
+        }
+        searchable = [{column: row[column] for column in names if column in row} for row in self.rows]
+        self.corpus = [fuzz_utils.default_process(" ".join(str(v) for v in row.values())) for row in searchable]
+        self.column_corpus = {
+            column: [fuzz_utils.default_process(str(row.get(column, ""))) for row in self.rows]
+            for column in names if plan.get(column, 'fuzzy') == 'fuzzy'
+        }
+        self.trigrams = TrigramIndex()
+        self.phonetics = PhoneticIndex()
+        for row_id, row_string in enumerate(self.corpus):
+            self.trigrams.add(row_id, row_string)
+            self.phonetics.add(row_id, searchable[row_id])
+        self.size_bytes = (
+            self.trigrams.size_bytes
+            + self.phonetics.size_bytes
+            + sum(array.nbytes for array in self.arrays.values())
+            + sum(array.nbytes for array in self.number_arrays.values())
+            + sum(sys.getsizeof(row) for row in self.rows)
+            + sum(sys.getsizeof(text) for text in self.corpus)
+            + sum(sys.getsizeof(text) for cells in self.column_corpus.values() for text in cells)
+        )
+
+    def resolve_column(self, target_column):
+        if not target_column:
+            return None
+        return self.columns.get(normalize_column(target_column))
+
+    def _match(self, compare, column, arrays=None):
+        arrays = self.arrays if arrays is None else arrays
+        if column:
+            arrays = [arrays[column]] if column in arrays else []
+        else:
+            arrays = arrays.values()
+        mask = np.zeros(len(self.rows), dtype=bool)
+        for array in arrays:
+            mask |= compare(array)
+        return np.flatnonzero(mask)
+
+    def exact_lookup(self, query, column=None):
+        number = profiling.normalize_number(query)
+        query = normalize_value(query)
+        hits = self._match(lambda array: array == query, column)
+        if not len(hits) and number is not None:
+            hits = self._match(lambda array: array == number, column, self.number_arrays)
+        return self.rows[hits[0]] if len(hits) else None
+
+    def prefix_lookup(self, query, column=None, limit=3):
+        """Returns up to `limit` rows with a value starting with query"""
+        query = normalize_value(query)
+        if len(query) < self.MIN_PREFIX_LENGTH:
+            return []
+        hits = self._match(lambda array: np.char.startswith(array, query), column)
+        return [self.rows[i] for i in hits[:limit]]
+
+    def phonetic_lookup(self, query, column=None, limit=3):
+        return self.phonetics.lookup(self.rows, self.corpus, query, column, limit)
+
+    def fuzzy_search(self, query, limit=3, score_cutoff=60, column=None):
+        if column and column not in self.column_corpus:
+            return [] # Exact-only column: the whole-row pass takes over
+        corpus = self.column_corpus[column] if column else self.corpus
+        return _fuzzy_rows(self.rows, corpus, query, limit, score_cutoff, self.trigrams)
+
+
+class _ArrowRows:
+    """Row-dict view of an Arrow table; rows are decoded only when returned"""
+
+    def __init__(self, table):
+        self.table = table
+
+    def __len__(self):
+        return self.table.num_rows
+
+    def __getitem__(self, row_id):
+        return self.table.slice(int(row_id), 1).to_pylist()[0]
+
+
+class ArrowSnapshot:
+    """
+    Memory-mapped Arrow snapshot of a connected dataset (see arrow_store).
+    Exact and prefix matching run as pyarrow compute kernels over the
+    mapped columns; dictionary-encoded columns are matched through their
+    small dictionaries. Phonetic and fuzzy matching score the candidates of
+    the database's native search index, so no worker decodes a corpus.
+    """
+
+    supports_append = False
+    MIN_PREFIX_LENGTH = 3
+    MAX_CANDIDATE_QUERIES = 32
+
+    def __init__(self, table, db_record):
+        self.table = table
+        self.db_record = db_record
+        self.rows = _ArrowRows(table)
+        self.columns = {normalize_column(name): name for name in table.column_names}
+        self.plan = profiling.index_plan(db_record.column_profile)
+        # Profiled empty columns are only skipped while they still are (_match scans them until then)
+        self.skipped = set()
+        self.skipped = {
+            name for name in table.column_names
+            if self.plan.get(name) == 'skip'
+            and not len(self._match(lambda array: arrow_store.pc.not_equal(array, ''), name))
+        }
+        self._candidates = OrderedDict() # normalized query -> DatasetIndex of candidate rows
+        self._candidates_lock = threading.Lock()
+        # The mapped file lives in the shared page cache, not this worker's heap
+        self.size_bytes = sys.getsizeof(self.columns) + 1024 * len(self.columns)
+
+    @classmethod
+    def from_record(cls, db_record):
+        return cls(arrow_store.open_table(db_record), db_record)
+
+    def resolve_column(self, target_column):
+        if not target_column:
+            return None
+        return self.columns.get(normalize_column(target_column))
+
+    @staticmethod
+    def _normalized(array):
+        pa = arrow_store.pa
+        if not pa.types.is_string(array.type):
+            array = array.cast(pa.string())
+        return arrow_store.pc.utf8_lower(arrow_store.pc.utf8_trim_whitespace(array))
+
+    def _match(self, compare, column):
+        pa, pc = arrow_store.pa, arrow_store.pc
+        mask = np.zeros(self.table.num_rows, dtype=bool)
+        names = [column] if column else self.table.column_names
+        for name in [name for name in names if name not in self.skipped]:
+            offset = 0
+            for chunk in self.table.column(name).chunks:
+                if pa.types.is_dictionary(chunk.type):
+                    hits = pc.take(compare(self._normalized(chunk.dictionary)), chunk.indices)
+                else:
+                    hits = compare(self._normalized(chunk))
+                mask[offset:offset + len(chunk)] |= hits.fill_null(False).to_numpy(zero_copy_only=False)
+                offset += len(chunk)
+        return np.flatnonzero(mask)
+
+    def exact_lookup(self, query, column=None):
+        number = profiling.normalize_number(query)
+        query = normalize_value(query)
+        hits = self._match(lambda array: arrow_store.pc.equal(array, query), column)
+        if not len(hits) and number is not None and number != query:
+            # Typed numeric columns print canonically, so "42.0" finds 42
+            hits = self._match(lambda array: arrow_store.pc.equal(array, number), column)
+        return self.rows[hits[0]] if len(hits) else None
+
+    def prefix_lookup(self, query, column=None, limit=3):
+        """Returns up to `limit` rows with a value starting with query"""
+        query = normalize_value(query)
+        if len(query) < self.MIN_PREFIX_LENGTH:
+            return []
+        hits = self._match(lambda array: arrow_store.pc.starts_with(array, pattern=query), column)
+        return [self.rows[i] for i in hits[:limit]]
+
+    def _candidate_index(self, query):
+        key = normalize_value(query)
+        with self._candidates_lock:
+            index = self._candidates.get(key)
+        if index is None:
+            index = DatasetIndex(
+                row_store.candidate_rows(self.db_record, query, limit=settings.SEARCH_TRIGRAM_MAX_CANDIDATES),
+                self.db_record.column_profile,
+            )
+            with self._candidates_lock:
+                self._candidates[key] = index
+                while len(self._candidates) > self.MAX_CANDIDATE_QUERIES:
+                    self._candidates.popitem(last=False)
+        return index
+
+    def phonetic_lookup(self, query, column=None, limit=3):
+        return self._candidate_index(query).phonetic_lookup(query, column, limit)
+
+    def fuzzy_search(self, query, limit=3, score_cutoff=60, column=None):
+        return self._candidate_index(query).fuzzy_search(query, limit, score_cutoff, column)
+
+
+SEARCH_ENGINES = {
+    'index': DatasetIndex,
+    'columnar': ColumnarSnapshot,
+}
+if arrow_store.available():
+    SEARCH_ENGINES['arrow'] = ArrowSnapshot
+
+
+# At most one multi-core scoring runs per worker process at a time
+_parallel_slot = threading.Semaphore(1)
+
+
+def _fuzzy_rows(rows, corpus, query, limit, score_cutoff, trigrams=None):
+    """
+    Scores corpus entries with partial_ratio. Large corpora are first
+    shortlisted through the trigram index; for a column corpus the row-level
+    trigrams are a superset, so the shortlist stays valid.
+    """
+    processed_query = fuzz_utils.default_process(query)
+    choices = corpus
+    row_ids = None
+    if trigrams is not None and len(corpus) >= settings.SEARCH_TRIGRAM_MIN_ROWS:
+        row_ids = trigrams.candidates(
+            processed_query, settings.SEARCH_TRIGRAM_MAX_CANDIDATES, settings.SEARCH_TRIGRAM_MIN_OVERLAP
+        )
+        if row_ids is not None:
+            choices = {int(row_id): corpus[row_id] for row_id in row_ids}
+
+    # Too many candidates (shortlist or whole corpus) to score on the request thread: spread them over cores
+    if len(choices) >= settings.SEARCH_PARALLEL_MIN_ROWS and _parallel_slot.acquire(blocking=False):
+        try:
+            if row_ids is None:
+                return [rows[i] for i in _parallel_extract(processed_query, corpus, limit, score_cutoff)]
+            # Shortlist ids ascend, so positions keep the row-id tie order
+            positions = _parallel_extract(processed_query, list(choices.values()), limit, score_cutoff)
+            return [rows[int(row_ids[i])] for i in positions]
+        finally:
+            _parallel_slot.release()
+
+    matches = process.extract(
+        processed_query, choices,
+        scorer=fuzz.partial_ratio, processor=None,
+        limit=limit, score_cutoff=score_cutoff
+    )
+    return [rows[match[2]] for match in matches]
+
+
+def _parallel_extract(processed_query, corpus, limit, score_cutoff):
+    """
+    process.extract over a list, with the scoring split across
+    settings.SEARCH_PARALLEL_WORKERS threads by rapidfuzz's cdist.
+    Returns the best positions in corpus, highest score first (ties by position).
+    """
+    scores = process.cdist(
+        [processed_query], corpus,
+        scorer=fuzz.partial_ratio, processor=None, score_cutoff=score_cutoff,
+        dtype=np.uint8, workers=settings.SEARCH_PARALLEL_WORKERS,
+    )[0]
+    # cdist reports scores below the cutoff as 0
+    hits = np.flatnonzero(scores) if score_cutoff > 0 else np.arange(len(corpus))
+    if len(hits) > limit:
+        # Keep the lowest row ids among ties at the cut, like process.extract
+        threshold = np.partition(scores[hits], -limit)[-limit]
+        above = hits[scores[hits] > threshold]
+        ties = hits[scores[hits] == threshold][:limit - len(above)]
+        hits = np.sort(np.concatenate([above, ties]))
+    return hits[np.argsort(-scores[hits].astype(np.int16), kind='stable')].tolist()
+
+
+class _CacheEntry:
+    __slots__ = ('data_version', 'watermark', 'index')
+
+    def __init__(self, data_version, watermark, index):
+        self.data_version = data_version
+        self.watermark = watermark # Highest row id in index; None if unknown
+        self.index = index
+
+
+class IndexCache:
+    """LRU of DatasetIndex objects bounded by their estimated memory footprint"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict() # db_id -> _CacheEntry
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.merges = 0
+        self.merged_rows = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, db_id, data_version):
+        """The index for exactly data_version, or None"""
+        with self.lock:
+            entry = self.entries.get(db_id)
+            if entry is None or entry.data_version != data_version:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(db_id)
+            return entry.index
+
+    def peek(self, db_id):
+        """The cached entry whatever its version (no hit/miss accounting)"""
+        with self.lock:
+            return self.entries.get(db_id)
+
+    def put(self, db_id, data_version, index, watermark=None):
+        with self.lock:
+            self._discard(db_id)
+            self.entries[db_id] = _CacheEntry(data_version, watermark, index)
+            self.total_bytes += index.size_bytes
+            # Never evict the entry we just added, even if it alone is over the cap
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                _, evicted = self.entries.popitem(last=False)
+                self.total_bytes -= evicted.index.size_bytes
+                self.evictions += 1
+
+    def merge(self, db_id, index, data_version, delta):
+        """
+        Appends the (row id, row) pairs of delta above the entry's watermark
+        to index and tags it data_version. Returns index, or None if the
+        entry was replaced or dropped meanwhile.
+        """
+        with self.lock:
+            entry = self.entries.get(db_id)
+            if entry is None or entry.index is not index:
+                return None
+            # A concurrent merge may have appended part of delta already
+            fresh = [(row_id, row) for row_id, row in delta if row_id > entry.watermark]
+            self.total_bytes -= index.size_bytes
+            for _, row in fresh:
+                index.add_row(row)
+            self.total_bytes += index.size_bytes
+            if fresh:
+                entry.watermark = fresh[-1][0]
+            entry.data_version = max(entry.data_version, data_version)
+            self.merges += 1
+            self.merged_rows += len(fresh)
+            self.entries.move_to_end(db_id)
+            return index
+
+    def discard(self, db_id):
+        with self.lock:
+            self._discard(db_id)
+
+    def _discard(self, db_id):
+        entry = self.entries.pop(db_id, None)
+        if entry is not None:
+            self.total_bytes -= entry.index.size_bytes
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "size_mb": round(self.total_bytes / (1024 * 1024), 2),
+                "max_mb": round(self.max_bytes / (1024 * 1024), 2),
+                "hits": self.hits,
+                "misses": self.misses,
+                "merges": self.merges,
+                "merged_rows": self.merged_rows,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            }
+
+
+_cache = IndexCache(settings.SEARCH_INDEX_CACHE_MAX_MB * 1024 * 1024)
+
+
+_warming = set()
+_warming_lock = threading.Lock()
+
+
+def build_index(db_record, rows=None):
+    """
+    Builds and caches the index for a ConnectedDatabase record using its
+    search engine. rows, if given, must be every row currently stored.
+    """
+    engine = SEARCH_ENGINES.get(db_record.search_engine, DatasetIndex)
+    watermark = None
+    if hasattr(engine, 'from_record'):
+        # File-backed engines read their own storage
+        index = engine.from_record(db_record)
+    else:
+        if rows is None:
+            # Rows and watermark from the same query, so no row falls between them
+            pairs = row_store.rows_after(db_record, 0)
+            rows = [row for _, row in pairs]
+            watermark = pairs[-1][0] if pairs else 0
+        else:
+            watermark = row_store.last_row_id(db_record)
+        index = engine(rows, db_record.column_profile)
+    _cache.put(db_record.id, db_record.data_version, index, watermark)
+    print(f"🗂️ Indexed {len(index.rows)} rows for {db_record.name} (v{db_record.data_version}, {db_record.search_engine})")
+    return index
+
+
+def get_cached_index(db_record):
+    """
+    Returns this worker's index for db_record's current data_version,
+    delta-merging it first if only appends happened since; None if there is
+    no usable index.
+    """
+    index = _cache.get(db_record.id, db_record.data_version)
+    if index is not None:
+        return index
+    return merge_delta(db_record)
+
+
+def merge_delta(db_record):
+    """
+    Brings this worker's cached index for db_record up to its data_version
+    by appending the rows stored above the index's watermark. Returns the
+    index, or None when there is none or it needs a rebuild instead.
+    """
+    entry = _cache.peek(db_record.id)
+    if entry is None:
+        return None
+    if entry.data_version >= db_record.data_version:
+        # Already merged (by a concurrent call) or newer than db_record
+        return entry.index if entry.data_version == db_record.data_version else None
+    if (
+        not entry.index.supports_append
+        or entry.watermark is None
+        or entry.data_version < db_record.rows_rewritten_version
+    ):
+        return None
+    delta = row_store.rows_after(db_record, entry.watermark)
+    return _cache.merge(db_record.id, entry.index, db_record.data_version, delta)
+
+
+def get_index(db_record):
+    """Returns the index for db_record, rebuilding it if missing or stale"""
+    index = get_cached_index(db_record)
+    if index is not None:
+        return index
+    return build_index(db_record)
+
+
+def warm_index_async(db_record):
+    """Builds db_record's index on a background thread (at most one build per database)"""
+    with _warming_lock:
+        if db_record.id in _warming:
+            return
+        _warming.add(db_record.id)
+
+    def _warm():
+        try:
+            build_index(db_record)
+        except Exception as e:
+            print(f"⚠️ Background index build failed for {db_record.name}: {e}")
+        finally:
+            with _warming_lock:
+                _warming.discard(db_record.id)
+            connection.close()
+
+    threading.Thread(target=_warm, daemon=True).start()
+
+
+def run_search(index, search_query, target_column=''):
+    """
+    Exact, prefix, phonetic, then fuzzy search over index; the fuzzy scan is
+    the last resort. The requested column (if it is real) is searched first,
+    then the whole row. Returns the tool result payload.
+    """
+    column = index.resolve_column(target_column)
+    if target_column and not column:
+        print(f"⚠️ Unknown target_column '{target_column}', searching all columns")
+    scopes = [column, None] if column else [None]
+
+    for scope in scopes:
+        # Exact Match Check: one hash probe
+        exact_row = index.exact_lookup(search_query, column=scope)
+        if exact_row is not None:
+            return {"results": [exact_row], "match_type": "exact"}
+
+        prefix_rows = index.prefix_lookup(search_query, column=scope, limit=3)
+        if prefix_rows:
+            return {"results": prefix_rows, "match_type": "prefix"}
+
+        # Phonetic Match Check: spelling variants and Devanagari by key lookup; weak matches fall through
+        phonetic_rows = index.phonetic_lookup(search_query, column=scope, limit=3)
+        if phonetic_rows:
+            return {"results": phonetic_rows, "match_type": "phonetic"}
+
+        # Fuzzy Match Check (if exact match fails) against the pre-processed corpus
+        results = index.fuzzy_search(search_query, limit=3, score_cutoff=60, column=scope)
+        if results:
+            return {"results": results, "status": "success"}
+
+    return {"results": [], "status": "not_found"}
+
+
+def drop_index(db_id):
+    _cache.discard(db_id)
+
+
+def cache_stats():
+    return _cache.stats()
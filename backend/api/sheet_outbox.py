@@ -0,0 +1,241 @@
+"""
+Write-behind queue for Google Sheets appends.
+
+A sheet-write tool call used to wait on Google for every row, and a surge
+of complaint intakes ran into the Sheets API quota one append_row at a
+time. Now execute_sheet_write stores the row locally, queues it in the
+SheetWriteOutbox table and answers the caller straight away.
+
+A flusher thread wakes every settings.SHEET_OUTBOX_FLUSH_INTERVAL_MS, takes
+each spreadsheet's due rows (oldest first, at most SHEET_OUTBOX_BATCH_ROWS)
+and sends them with a single append_rows request. Failed batches are
+retried with jittered exponential backoff; quota errors (HTTP 429) wait
+SHEET_OUTBOX_QUOTA_BACKOFF_SECONDS and don't count as attempts. After
+SHEET_OUTBOX_MAX_ATTEMPTS a row is marked 'failed' and left for an operator;
+its mirrored row is kept through sheet refreshes (see failed_row_hashes).
+
+Entries are claimed with a token before sending, so flushers in several
+worker processes never send the same row twice; a claim older than
+SHEET_OUTBOX_CLAIM_TIMEOUT_SECONDS (its process died) is released again.
+The flusher stops when the queue is empty and the next write restarts it;
+`python manage.py flush_sheet_outbox` drains rows left by a restart. The
+flusher only runs in the process that took the write, so deployments with
+several or short-lived workers should also run
+`python manage.py flush_sheet_outbox --interval N` (or call flush_due() on a
+schedule); otherwise a dead worker's rows wait for the next write.
+"""
+import random
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+from .models import SheetWriteOutbox
+from .utils import append_sheet_rows
+from . import row_store
+
+QUOTA_STATUS_CODES = {429}
+ACTIVE_STATUSES = ('pending', 'sending')
+
+
+def enqueue(db_record, values):
+    """
+    Queues a row for db_record's Google Sheet. Call it inside the
+    transaction that mirrors the row locally; the flusher starts on commit.
+    """
+    entry = SheetWriteOutbox.objects.create(
+        database=db_record,
+        spreadsheet_id=db_record.connection_details['spreadsheet_id'],
+        values=values,
+    )
+    transaction.on_commit(start_flusher)
+    return entry
+
+
+def has_pending(db_record):
+    """True while rows written to db_record are still on their way to its sheet"""
+    return SheetWriteOutbox.objects.filter(database=db_record, status__in=ACTIVE_STATUSES).exists()
+
+
+def failed_row_hashes(db_record):
+    """
+    row_store.row_hash -> count of db_record's rows that gave up on reaching
+    the sheet. They are stored locally but missing from the sheet's export.
+    """
+    # Written rows hold the columns of their time, which later columns only extend
+    hashes = Counter()
+    for values in SheetWriteOutbox.objects.filter(database=db_record, status='failed').values_list('values', flat=True):
+        hashes[row_store.row_hash(dict(zip(db_record.columns, values)))] += 1
+    return hashes
+
+
+class FlushStats:
+    """Counters and recent flush latencies of this process's flushes"""
+
+    RECENT = 200
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flushes = 0
+        self.rows_sent = 0
+        self.failures = 0
+        self.quota_errors = 0
+        self.last_flush_at = None
+        self.last_error = ''
+        self.latencies = deque(maxlen=self.RECENT) # Seconds per successful append_rows request
+
+    def record_flush(self, rows, seconds):
+        with self.lock:
+            self.flushes += 1
+            self.rows_sent += rows
+            self.last_flush_at = timezone.now()
+            self.latencies.append(seconds)
+
+    def record_failure(self, error, quota):
+        with self.lock:
+            self.failures += 1
+            self.quota_errors += quota
+            self.last_error = str(error)[:500]
+
+    def snapshot(self):
+        with self.lock:
+            latencies = sorted(self.latencies)
+            return {
+                'flushes': self.flushes,
+                'rows_sent': self.rows_sent,
+                'failures': self.failures,
+                'quota_errors': self.quota_errors,
+                'last_flush_at': self.last_flush_at,
+                'last_error': self.last_error,
+                'flush_latency_ms': {
+                    'p50': round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+                    'p95': round(latencies[int(len(latencies) * 0.95)] * 1000, 1) if latencies else None,
+                    'max': round(latencies[-1] * 1000, 1) if latencies else None,
+                },
+            }
+
+
+_stats = FlushStats()
+
+
+def _is_quota_error(error):
+    return getattr(error, 'code', None) in QUOTA_STATUS_CODES
+
+
+def _backoff_seconds(attempts, quota):
+    if quota:
+        delay = settings.SHEET_OUTBOX_QUOTA_BACKOFF_SECONDS
+    else:
+        delay = min(settings.SHEET_OUTBOX_MAX_BACKOFF_SECONDS, settings.SHEET_OUTBOX_BASE_BACKOFF_SECONDS * 2 ** max(attempts - 1, 0))
+    # Jitter, so retries from several workers don't land on Google together
+    return delay * random.uniform(0.5, 1.5)
+
+
+def _flush_sheet(spreadsheet_id, now):
+    pending = SheetWriteOutbox.objects.filter(spreadsheet_id=spreadsheet_id, status='pending').order_by('id')
+    batch_ids = list(pending.values_list('id', 'next_attempt_at')[:settings.SHEET_OUTBOX_BATCH_ROWS])
+    # Rows go out in write order: while the oldest is backing off, the sheet waits
+    if not batch_ids or batch_ids[0][1] > now:
+        return 0
+
+    token = uuid.uuid4().hex
+    SheetWriteOutbox.objects.filter(id__in=[row_id for row_id, _ in batch_ids], status='pending').update(
+        status='sending', claim=token, claimed_at=now
+    )
+    claimed = SheetWriteOutbox.objects.filter(claim=token)
+    entries = list(claimed.order_by('id'))
+    if not entries:
+        return 0 # Another flusher got them
+
+    started = time.perf_counter()
+    try:
+        append_sheet_rows(spreadsheet_id, [entry.values for entry in entries])
+    except Exception as e:
+        quota = _is_quota_error(e)
+        _stats.record_failure(e, quota)
+        if not quota:
+            claimed.update(attempts=F('attempts') + 1)
+        attempts = max(entry.attempts for entry in entries) + (0 if quota else 1)
+        claimed.filter(attempts__gte=settings.SHEET_OUTBOX_MAX_ATTEMPTS).update(status='failed', last_error=str(e)[:1000])
+        claimed.filter(status='sending').update(
+            status='pending',
+            next_attempt_at=timezone.now() + timedelta(seconds=_backoff_seconds(attempts, quota)),
+            last_error=str(e)[:1000],
+        )
+        claimed.update(claim='', claimed_at=None)
+        print(f"⚠️ Sheet append of {len(entries)} rows to {spreadsheet_id} failed ({'quota' if quota else f'attempt {attempts}'}): {e}")
+        return 0
+
+    seconds = time.perf_counter() - started
+    claimed.delete()
+    _stats.record_flush(len(entries), seconds)
+    print(f"📤 Appended {len(entries)} queued rows to {spreadsheet_id} in {seconds * 1000:.0f} ms")
+    return len(entries)
+
+
+def flush_due():
+    """Sends every due row, one append_rows request per spreadsheet; returns the number of rows sent"""
+    now = timezone.now()
+    # Claims of a flush that never finished (its process died) are released
+    stale = now - timedelta(seconds=settings.SHEET_OUTBOX_CLAIM_TIMEOUT_SECONDS)
+    SheetWriteOutbox.objects.filter(status='sending', claimed_at__lt=stale).update(status='pending', claim='', claimed_at=None)
+
+    spreadsheet_ids = (
+        SheetWriteOutbox.objects.filter(status='pending', next_attempt_at__lte=now)
+        .values_list('spreadsheet_id', flat=True).order_by().distinct()
+    )
+    return sum(_flush_sheet(spreadsheet_id, now) for spreadsheet_id in list(spreadsheet_ids))
+
+
+_flusher = None
+_flusher_lock = threading.Lock()
+
+
+def start_flusher():
+    """Starts this process's flusher thread unless it is already running"""
+    global _flusher
+    with _flusher_lock:
+        if _flusher is not None and _flusher.is_alive():
+            return
+        _flusher = threading.Thread(target=_run_flusher, name='sheet-outbox', daemon=True)
+        _flusher.start()
+
+
+def _run_flusher():
+    global _flusher
+    interval = settings.SHEET_OUTBOX_FLUSH_INTERVAL_MS / 1000
+    try:
+        while True:
+            # Waiting first lets the rows of a burst coalesce into one request
+            time.sleep(interval)
+            try:
+                flush_due()
+            except Exception as e:
+                print(f"❌ Sheet outbox flush failed: {e}")
+                connection.close()
+            # Decided under the lock, so a write committed meanwhile either is seen here or restarts the flusher
+            with _flusher_lock:
+                if not SheetWriteOutbox.objects.filter(status__in=ACTIVE_STATUSES).exists():
+                    _flusher = None
+                    return
+    finally:
+        connection.close()
+
+
+def outbox_stats():
+    """Queue depth from the outbox table plus this process's flush metrics"""
+    counts = dict.fromkeys(['pending', 'sending', 'failed'], 0)
+    for row in SheetWriteOutbox.objects.values('status').annotate(count=Count('id')).order_by():
+        counts[row['status']] = row['count']
+    oldest = SheetWriteOutbox.objects.filter(status__in=ACTIVE_STATUSES).aggregate(oldest=Min('created_at'))['oldest']
+    return {
+        'queue_depth': counts['pending'] + counts['sending'],
+        'by_status': counts,
+        'oldest_pending_seconds': round((timezone.now() - oldest).total_seconds(), 1) if oldest else None,
+        'flusher_running': _flusher is not None and _flusher.is_alive(),
+        **_stats.snapshot(),
+    }
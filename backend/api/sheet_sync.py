@@ -0,0 +1,182 @@
+"""
+Incremental refresh of Google Sheets connections.
+
+connect_google_sheets snapshots a sheet once. refresh_sheet() brings the
+stored rows up to date with edits made in the sheet since, applying only
+the difference:
+
+1. Metadata check: the sheet's Drive modifiedTime (needs the service
+   account). If it is unchanged, the refresh stops here.
+2. Content check: the CSV export's SHA-1. Covers public sheets the service
+   account cannot see; an identical export stops the refresh too.
+3. Row diff: rows are matched by row_store.row_hash. Rows whose hash is no
+   longer in the sheet are deleted and new hashes are inserted, so an edited
+   row is one delete plus one insert. The connected columns are kept even
+   when empty, since the write tool and stored rows use them; new sheet
+   columns are added. Rows are only deleted if nothing was written to the
+   dataset since the export was fetched.
+
+Write-only connections (no search tool) store no sheet rows and are
+skipped. Run it on a schedule with `python manage.py refresh_google_sheets`.
+"""
+import hashlib
+import os
+from collections import defaultdict
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import ConnectedDatabase, ConnectedDatabaseRow
+from .utils import fetch_google_sheet_as_df, fetch_google_sheet_csv, get_gspread_client
+from . import profiling, result_cache, row_store, search_index, sheet_outbox
+
+DELETE_BATCH_SIZE = 1000
+
+
+def sheet_modified_time(spreadsheet_id):
+    """Drive modifiedTime of the spreadsheet, or None when the service account can't read it"""
+    if not os.path.exists(settings.SERVICE_ACCOUNT_FILE):
+        return None
+    try:
+        return get_gspread_client().get_file_drive_metadata(spreadsheet_id).get('modifiedTime')
+    except Exception as e:
+        print(f"⚠️ Drive metadata check failed for {spreadsheet_id}: {e}")
+        return None
+
+
+def diff_rows(existing, new_rows, keep_hashes=None):
+    """
+    Matches new_rows against existing (id, row_hash) pairs by content hash.
+    Returns (ids to delete, rows to insert, number of unchanged rows);
+    duplicate rows are matched one for one. keep_hashes (hash -> count)
+    names rows missing from new_rows that must not be deleted.
+    """
+    ids_by_hash = defaultdict(list)
+    for row_id, row_hash in existing:
+        ids_by_hash[row_hash].append(row_id)
+    to_insert = []
+    unchanged = 0
+    for row in new_rows:
+        ids = ids_by_hash.get(row_store.row_hash(row))
+        if ids:
+            ids.pop()
+            unchanged += 1
+        else:
+            to_insert.append(row)
+    for row_hash, count in (keep_hashes or {}).items():
+        ids = ids_by_hash.get(row_hash)
+        if ids:
+            del ids[-count:]
+    to_delete = [row_id for ids in ids_by_hash.values() for row_id in ids]
+    return to_delete, to_insert, unchanged
+
+
+def can_read(db_record):
+    """True when the sheet was connected with a read (search) tool"""
+    stored = (db_record.connection_details or {}).get('can_read')
+    if stored is not None:
+        return stored
+    # Connections made before the flag was stored
+    return not db_record.summary.startswith('Read: N/A')
+
+
+def refresh_sheet(db_record, force=False):
+    """
+    Applies a Google Sheet's edits to db_record's rows and search indexes.
+    Returns a summary dict: status is 'unchanged', 'updated' or 'deferred'
+    (queued writes have not reached the sheet yet, or rows were written
+    while it ran), checked is the step that decided ('write-only', 'outbox',
+    'metadata', 'content' or 'rows').
+    """
+    details = dict(db_record.connection_details or {})
+    spreadsheet_id = details.get('spreadsheet_id')
+    if not spreadsheet_id:
+        raise ValueError(f"{db_record.name} has no spreadsheet_id")
+
+    # Write-only connections deliberately store no sheet rows and have no search tool
+    if not can_read(db_record):
+        return {'status': 'unchanged', 'checked': 'write-only'}
+
+    # Rows still in the write-behind outbox would look deleted from the sheet
+    if sheet_outbox.has_pending(db_record):
+        return {'status': 'deferred', 'checked': 'outbox'}
+    # Rows stored after the export is fetched may be missing from it; see step 3
+    last_row_id = row_store.last_row_id(db_record)
+
+    # 1. Cheap metadata check
+    modified_time = sheet_modified_time(spreadsheet_id)
+    if not force and modified_time and modified_time == details.get('sheet_modified_time'):
+        return {'status': 'unchanged', 'checked': 'metadata'}
+
+    # 2. Content check
+    csv_text = fetch_google_sheet_csv(spreadsheet_id)
+    content_hash = hashlib.sha1(csv_text.encode('utf-8')).hexdigest()
+    details['sheet_modified_time'] = modified_time
+    details['last_refreshed_at'] = timezone.now().isoformat()
+    if not force and content_hash == details.get('sheet_content_hash'):
+        db_record.connection_details = details
+        db_record.save(update_fields=['connection_details'])
+        return {'status': 'unchanged', 'checked': 'content'}
+
+    # 3. Row diff
+    df, columns = fetch_google_sheet_as_df(spreadsheet_id, csv_text, keep_columns=db_record.columns)
+    new_rows = df.to_dict(orient='records')
+    existing = ConnectedDatabaseRow.objects.filter(database=db_record).values_list('id', 'row_hash')
+    # Writes the outbox gave up on are stored here but not in the sheet: they aren't deletions
+    to_delete, to_insert, unchanged = diff_rows(
+        existing.iterator(chunk_size=5000), new_rows, sheet_outbox.failed_row_hashes(db_record)
+    )
+
+    details['sheet_content_hash'] = content_hash
+    changed = bool(to_delete or to_insert)
+    # Indexes can't drop rows or columns in place: those changes make every worker rebuild
+    rewritten = bool(to_delete) or columns != db_record.columns
+    with transaction.atomic():
+        # Sheet writes bump data_version on this row, so the lock holds them off until the diff is applied
+        ConnectedDatabase.objects.select_for_update().filter(pk=db_record.pk).first()
+        if sheet_outbox.has_pending(db_record):
+            return {'status': 'deferred', 'checked': 'outbox'}
+        if row_store.last_row_id(db_record) != last_row_id:
+            # A write landed after the export was fetched: its row would look deleted
+            return {'status': 'deferred', 'checked': 'rows'}
+        if changed:
+            # Bumped before inserting, like sheet writes, so row ids commit in order (see search_index)
+            bump = {'data_version': F('data_version') + 1}
+            if rewritten:
+                bump['rows_rewritten_version'] = F('data_version') + 1
+            ConnectedDatabase.objects.filter(pk=db_record.pk).update(**bump)
+        for start in range(0, len(to_delete), DELETE_BATCH_SIZE):
+            ConnectedDatabaseRow.objects.filter(id__in=to_delete[start:start + DELETE_BATCH_SIZE]).delete()
+        row_store.insert_rows(db_record, to_insert)
+        db_record.connection_details = details
+        update_fields = ['connection_details']
+        if columns != db_record.columns:
+            print(f"⚠️ Columns of {db_record.name} changed to {columns}; its Vapi tools still list the old ones")
+            db_record.columns = columns
+            update_fields.append('columns')
+        if changed:
+            db_record.column_profile = profiling.profile_rows(new_rows)
+            update_fields.append('column_profile')
+        db_record.save(update_fields=update_fields)
+    db_record.refresh_from_db(fields=['data_version', 'rows_rewritten_version'])
+
+    if changed:
+        if rewritten:
+            search_index.drop_index(db_record.id)
+            search_index.warm_index_async(db_record)
+        else:
+            search_index.merge_delta(db_record)
+        result_cache.invalidate(db_record.id)
+
+    return {
+        'status': 'updated' if to_delete or to_insert else 'unchanged',
+        'checked': 'rows',
+        'inserted': len(to_insert),
+        'deleted': len(to_delete),
+        'unchanged': unchanged,
+        'data_version': db_record.data_version,
+    }
+
+
+def sheet_databases():
+    return ConnectedDatabase.objects.filter(source_type='googlesheets')
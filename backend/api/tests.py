@@ -1,3 +1,185 @@
-from django.test import TestCase
+import asyncio
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+import requests
+from django.test import SimpleTestCase, override_settings
+from . import http_client
+from .phonetics import phonetic_keys
+from .profiling import _index_kind, normalize_number, profile_rows
+from .result_shaper import key_columns, payload_size, shape_result
+from .row_store import row_hash
+from .sheet_sync import diff_rows
 
-# Create your tests here.
+
+class DiffRowsTests(SimpleTestCase):
+    """sheet_sync.diff_rows: what a sheet refresh deletes and inserts"""
+
+    def existing(self, rows):
+        return [(row_id, row_hash(row)) for row_id, row in enumerate(rows, start=1)]
+
+    def test_unchanged_sheet_changes_nothing(self):
+        rows = [{'name': 'Ravi', 'ward': 1}, {'name': 'Sita', 'ward': 2}]
+        self.assertEqual(diff_rows(self.existing(rows), rows), ([], [], 2))
+
+    def test_edited_row_is_one_delete_and_one_insert(self):
+        rows = [{'name': 'Ravi', 'ward': 1}, {'name': 'Sita', 'ward': 2}]
+        edited = [{'name': 'Ravi', 'ward': 1}, {'name': 'Sita', 'ward': 3}]
+        self.assertEqual(diff_rows(self.existing(rows), edited), ([2], [{'name': 'Sita', 'ward': 3}], 1))
+
+    def test_duplicates_are_matched_one_for_one(self):
+        rows = [{'name': 'Sita', 'ward': 2}] * 3
+        # One copy removed from the sheet: exactly one stored copy goes
+        to_delete, to_insert, unchanged = diff_rows(self.existing(rows), rows[:2])
+        self.assertEqual((len(to_delete), to_insert, unchanged), (1, [], 2))
+        # One copy added: exactly one is inserted
+        to_delete, to_insert, unchanged = diff_rows(self.existing(rows), rows * 2)
+        self.assertEqual((to_delete, len(to_insert), unchanged), ([], 3, 3))
+
+    def test_sheet_reads_match_stored_rows(self):
+        # pandas reads blanks as NaN and integer columns with blanks as floats
+        stored = [{'name': 'Ravi', 'ward': '12', 'note': ''}]
+        reread = [{'name': 'Ravi ', 'ward': 12.0, 'note': float('nan')}]
+        self.assertEqual(diff_rows(self.existing(stored), reread), ([], [], 1))
+
+    def test_kept_hashes_are_not_deleted(self):
+        # Rows the write-behind outbox gave up on are stored but missing from the sheet
+        rows = [{'name': 'Ravi', 'ward': '1'}, {'name': 'Lost', 'ward': '7'}, {'name': 'Lost', 'ward': '7'}]
+        keep = {row_hash({'name': 'Lost', 'ward': '7'}): 1}
+        to_delete, to_insert, unchanged = diff_rows(self.existing(rows), rows[:1], keep)
+        self.assertEqual((len(to_delete), to_insert, unchanged), (1, [], 1))
+
+
+class _FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {}
+
+
+@override_settings(HTTP_CLIENT_BASE_BACKOFF_SECONDS=0, HTTP_CLIENT_MAX_RETRIES=3)
+class HttpClientRetryTests(SimpleTestCase):
+    """http_client retry rules: a retried POST can create a second tool or call"""
+
+    def send(self, method, outcomes):
+        """Sends one request through a session answering with outcomes in turn; returns (result, attempts)"""
+        session = mock.Mock()
+        session.request.side_effect = [
+            outcome if isinstance(outcome, Exception) else _FakeResponse(outcome) for outcome in outcomes
+        ]
+        with mock.patch.object(http_client, 'get_session', return_value=session):
+            try:
+                result = http_client.request(method, 'https://api.vapi.ai/call').status_code
+            except requests.exceptions.RequestException as e:
+                result = e.__class__
+        return result, session.request.call_count
+
+    def test_post_is_not_retried_after_it_may_have_taken_effect(self):
+        for status in (500, 502, 504):
+            self.assertEqual(self.send('POST', [status, 200]), (status, 1))
+        self.assertEqual(self.send('POST', [requests.exceptions.ReadTimeout(), 200]), (requests.exceptions.ReadTimeout, 1))
+
+    def test_post_is_retried_when_refused(self):
+        for status in (429, 503):
+            self.assertEqual(self.send('POST', [status, 200]), (200, 2))
+        self.assertEqual(self.send('POST', [requests.exceptions.ConnectTimeout(), 200]), (200, 2))
+
+    def test_idempotent_methods_are_retried_on_server_errors(self):
+        for method in ('GET', 'PATCH'):
+            self.assertEqual(self.send(method, [502, 500, 200]), (200, 3))
+            self.assertEqual(self.send(method, [requests.exceptions.ReadTimeout(), 200]), (200, 2))
+
+    def test_retries_stop_at_the_limit(self):
+        self.assertEqual(self.send('GET', [503] * 5), (503, 4))
+
+
+@skipUnless(http_client.httpx, "httpx is not installed")
+@override_settings(HTTP_CLIENT_BASE_BACKOFF_SECONDS=0, HTTP_CLIENT_MAX_RETRIES=3)
+class AsyncHttpClientRetryTests(SimpleTestCase):
+    """The same rules for async_request"""
+
+    def send(self, method, statuses):
+        httpx = http_client.httpx
+        statuses = list(statuses)
+        attempts = []
+
+        def handler(request):
+            attempts.append(request)
+            return httpx.Response(statuses.pop(0))
+
+        async def _send():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+                with mock.patch.object(http_client, 'get_async_client', return_value=client):
+                    return (await http_client.async_request(method, 'https://api.vapi.ai/call')).status_code
+
+        return asyncio.run(_send()), len(attempts)
+
+    def test_post_retry_rules(self):
+        for status in (500, 502, 504):
+            self.assertEqual(self.send('POST', [status, 200]), (status, 1))
+        for status in (429, 503):
+            self.assertEqual(self.send('POST', [status, 200]), (200, 2))
+        self.assertEqual(self.send('PATCH', [502, 200]), (200, 2))
+
+
+class PhoneticKeysTests(SimpleTestCase):
+    """phonetics.phonetic_keys: spelling and script variants share keys"""
+
+    def test_spelling_variants_collide(self):
+        for variants in (("Sharma", "Sarma"), ("Srivastava", "Shrivastav", "Srivastaw"), ("Lakshmi", "Laxmi")):
+            self.assertEqual(len({tuple(phonetic_keys(word)) for word in variants}), 1, variants)
+
+    def test_devanagari_matches_latin(self):
+        self.assertEqual(phonetic_keys("Ravi Sharma"), phonetic_keys("रवि शर्मा"))
+
+    def test_short_skeletons_keep_their_vowels(self):
+        # "Deli" and "Deol" are both "dl" as bare consonants
+        self.assertNotEqual(phonetic_keys("Deli"), phonetic_keys("Deol"))
+
+    def test_single_letters_and_numbers(self):
+        self.assertEqual(phonetic_keys("a 42 b"), ["42"])
+
+
+class ProfilingTests(SimpleTestCase):
+    """profiling: canonical numbers and the index kind picked per column"""
+
+    def test_normalize_number(self):
+        self.assertEqual(normalize_number("42.0"), "42")
+        self.assertEqual(normalize_number(42), "42")
+        self.assertEqual(normalize_number(" 1,200 "), "1200")
+        self.assertEqual(normalize_number("3.5"), "3.5")
+        for value in ("Ward 3", "nan", "inf", True):
+            self.assertIsNone(normalize_number(value), value)
+
+    def test_index_kind(self):
+        self.assertEqual(_index_kind('empty', 0, 0, 0.0, 0), 'skip')
+        self.assertEqual(_index_kind('integer', 50, 50, 1.0, 50), 'numeric')
+        self.assertEqual(_index_kind('text', 1, 20, 0.05, 0), 'exact') # Constant
+        self.assertEqual(_index_kind('text', 20, 20, 1.0, 20), 'exact') # IDs
+        self.assertEqual(_index_kind('text', 20, 20, 1.0, 0), 'fuzzy') # Unique names
+        self.assertEqual(_index_kind('text', 3, 20, 0.15, 0), 'fuzzy')
+
+    def test_profile_rows(self):
+        rows = [{'id': f"CMP-{i}", 'city': "Delhi", 'note': "", 'amount': i * 1.5} for i in range(10)]
+        profile = profile_rows(rows)
+        self.assertEqual(
+            {column: stats['index'] for column, stats in profile.items()},
+            {'id': 'exact', 'city': 'exact', 'note': 'skip', 'amount': 'numeric'},
+        )
+        self.assertEqual(profile['note']['null_ratio'], 1.0)
+
+
+class ResultShaperTests(SimpleTestCase):
+    """result_shaper: key columns and the payload byte budget"""
+
+    def test_key_columns_need_separators(self):
+        columns = ['paid', 'valid', 'namespace', 'customer_id', 'CustomerID', 'ID', 'full_name', 'phone_number', 'mobileNo']
+        self.assertEqual(key_columns(columns), ['customer_id', 'CustomerID', 'ID', 'full_name', 'phone_number', 'mobileNo'])
+
+    @override_settings(TOOL_RESULT_MAX_BYTES=400, TOOL_RESULT_MAX_VALUE_CHARS=200)
+    def test_single_wide_row_fits_the_budget(self):
+        row = {'complaint_id': 'C1', 'name': 'Ravi', 'a': 'a' * 150, 'b': 'b' * 150, 'c': 'c' * 150}
+        db_record = SimpleNamespace(columns=list(row), display_columns=[])
+        shaped = shape_result(db_record, {'results': [row]}, 'C1')
+        self.assertLessEqual(payload_size(shaped), 400)
+        self.assertEqual(list(shaped['results'][0])[:2], ['complaint_id', 'name']) # Keys go last
+        self.assertTrue(shaped['truncated'])
+        self.assertGreater(shaped['omitted_columns'], 0)
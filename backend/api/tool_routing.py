@@ -0,0 +1,104 @@
+"""
+Routing of Vapi tool calls to connected datasets.
+
+Every tool created for a dataset is recorded in the ToolBinding table
+(tool id -> database, read/write, function name) by the connect paths.
+execute_db_query and execute_sheet_write used to find their dataset with a
+JSON scan over ConnectedDatabase.vapi_tool_ids and, failing that, by
+sanitizing the name of every Google Sheets dataset.
+
+resolve() answers from a per-process map first; a miss is one lookup on
+the table's unique tool_id index (or the function_name index, for calls
+without a tool id), whose result is kept in the map. Deleting a dataset
+cascades to its bindings; entries other workers still hold for it are
+dropped the first time they no longer load.
+"""
+import threading
+from django.db import IntegrityError, transaction
+from .models import ConnectedDatabase, ToolBinding
+
+_lock = threading.Lock()
+_by_tool_id = {} # tool id -> database id
+_by_function = {} # (kind, function name) -> database id
+_stats = {'hits': 0, 'lookups': 0, 'misses': 0}
+
+
+def _remember(tool_id, kind, function_name, db_id):
+    with _lock:
+        if tool_id:
+            _by_tool_id[tool_id] = db_id
+        if function_name:
+            _by_function[(kind, function_name)] = db_id
+
+
+def bind(db_record, tool_id, kind, function_name):
+    """Records that tool_id ('read' or 'write', calling function_name) belongs to db_record"""
+    if not tool_id:
+        return
+    try:
+        with transaction.atomic():
+            ToolBinding.objects.update_or_create(
+                tool_id=tool_id,
+                defaults={'database': db_record, 'kind': kind, 'function_name': (function_name or '')[:64]},
+            )
+    except IntegrityError: # A concurrent bind of the same tool won
+        pass
+    # Warmed only once the binding (and its dataset) are committed
+    transaction.on_commit(lambda: _remember(tool_id, kind, function_name, db_record.id))
+
+
+def _load(db_id):
+    try:
+        return ConnectedDatabase.objects.get(pk=db_id)
+    except ConnectedDatabase.DoesNotExist:
+        return None
+
+
+def resolve(tool_id, function_name, kind):
+    """
+    Returns the ConnectedDatabase a tool call is for, or None when neither
+    its tool id nor its function name is bound.
+    """
+    with _lock:
+        db_id = _by_tool_id.get(tool_id) if tool_id else None
+        if db_id is None and function_name:
+            db_id = _by_function.get((kind, function_name))
+    if db_id is not None:
+        db_record = _load(db_id)
+        if db_record is not None:
+            with _lock:
+                _stats['hits'] += 1
+            return db_record
+        forget_database(db_id) # Deleted by another worker
+
+    with _lock:
+        _stats['lookups'] += 1
+    binding = None
+    if tool_id:
+        binding = ToolBinding.objects.select_related('database').filter(tool_id=tool_id).first()
+    if binding is None and function_name:
+        binding = (
+            ToolBinding.objects.select_related('database')
+            .filter(function_name=function_name, kind=kind).order_by('-id').first()
+        )
+    if binding is None:
+        with _lock:
+            _stats['misses'] += 1
+        return None
+    _remember(tool_id if binding.tool_id == tool_id else None, kind, function_name, binding.database_id)
+    _remember(binding.tool_id, binding.kind, binding.function_name, binding.database_id)
+    return binding.database
+
+
+def forget_database(db_id):
+    """Drops db_id's entries from this process's map (its ToolBinding rows go with the dataset)"""
+    with _lock:
+        for tool_id in [t for t, bound in _by_tool_id.items() if bound == db_id]:
+            del _by_tool_id[tool_id]
+        for key in [k for k, bound in _by_function.items() if bound == db_id]:
+            del _by_function[key]
+
+
+def routing_stats():
+    with _lock:
+        return {'bound_tools': len(_by_tool_id), **_stats}
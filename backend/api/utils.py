@@ -1,6 +1,12 @@
-import requests
+import io
+import os
 import re
+import threading
+import gspread
 import pandas as pd
+from django.conf import settings
+from oauth2client.service_account import ServiceAccountCredentials
+from . import http_client
 
 def deploy_supabase_edge_logic(db_details, user_access_token):
     # 1. ROBUST PROJECT REF EXTRACTION
@@ -94,11 +100,13 @@ serve(async (req) => {{
     }
 
     # First attempt: POST to create
-    res = requests.post(deploy_url, json=payload, headers=mgmt_headers)
+    res = http_client.post(deploy_url, json=payload, headers=mgmt_headers, endpoint="POST api.supabase.com/functions")
     
     # Second attempt: PATCH if it already exists (409 Conflict)
     if res.status_code == 409:
-        res = requests.patch(f"{deploy_url}/{function_slug}", json=payload, headers=mgmt_headers)
+        res = http_client.patch(
+            f"{deploy_url}/{function_slug}", json=payload, headers=mgmt_headers, endpoint="PATCH api.supabase.com/functions"
+        )
 
     if res.status_code in [200, 201]:
         return f"https://{project_ref}.supabase.functions.co/{function_slug}"
@@ -110,12 +118,106 @@ serve(async (req) => {{
     
 
 
-def fetch_google_sheet_as_df(spreadsheet_id):
+def google_sheet_export_url(spreadsheet_id):
+    return f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}/export?format=csv"
+
+
+def fetch_google_sheet_csv(spreadsheet_id):
+    """Downloads the first sheet of a public or 'anyone with link' Google Sheet as CSV text."""
+    response = http_client.get(google_sheet_export_url(spreadsheet_id), timeout=60, endpoint="GET docs.google.com/export")
+    response.raise_for_status()
+    response.encoding = 'utf-8'
+    return response.text
+
+
+def fetch_google_sheet_as_df(spreadsheet_id, csv_text=None, keep_columns=None):
     """
     Reads a public or 'anyone with link' Google Sheet into a Pandas DataFrame.
+    Pass csv_text to parse an export that was already downloaded, and
+    keep_columns (e.g. a connected sheet's columns) to keep those columns
+    first even when they are empty or gone from the sheet.
     """
-    url = f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}/export?format=csv"
-    df = pd.read_csv(url)
+    source = io.StringIO(csv_text) if csv_text is not None else google_sheet_export_url(spreadsheet_id)
+    df = pd.read_csv(source)
     # Clean up empty columns or rows
-    df = df.dropna(how='all', axis=1).dropna(how='all', axis=0)
-    return df, df.columns.tolist()
\ No newline at end of file
+    if keep_columns:
+        filled = [column for column in df.columns if column not in keep_columns and df[column].notna().any()]
+        df = df.reindex(columns=list(keep_columns) + filled)
+    else:
+        df = df.dropna(how='all', axis=1)
+    df = df.dropna(how='all', axis=0)
+    return df, df.columns.tolist()
+
+
+# Google Sheets API access, shared by every sheet write in this process.
+# The client keeps one authorized session (its access token refreshes itself);
+# worksheet handles are cached per spreadsheet, so a write is only the append.
+SHEETS_SCOPE = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+
+_gspread_client = None
+_worksheets = {} # spreadsheet id -> gspread Worksheet (the first sheet)
+_sheets_lock = threading.Lock()
+
+
+def service_account_path():
+    """Path of the service-account key, written from GOOGLE_SERVICE_ACCOUNT_JSON if the file is missing"""
+    json_path = settings.SERVICE_ACCOUNT_FILE
+    if not os.path.exists(json_path):
+        # This might happen if the Env Var was missing during startup
+        print("❌ Service account file missing! Checking for Env Var...")
+        sa_content = os.getenv('GOOGLE_SERVICE_ACCOUNT_JSON')
+        if sa_content:
+            with open(json_path, 'w') as f:
+                f.write(sa_content)
+        else:
+            raise FileNotFoundError(f"Service account credentials not found in Env or File.")
+    return json_path
+
+
+def get_gspread_client():
+    """The process-wide gspread client, authorized on first use"""
+    global _gspread_client
+    with _sheets_lock:
+        if _gspread_client is None:
+            json_path = service_account_path()
+            print(f"🔑 Authorizing Google Sheets client with {json_path}")
+            creds = ServiceAccountCredentials.from_json_keyfile_name(json_path, SHEETS_SCOPE)
+            client = gspread.authorize(creds)
+            client.set_timeout(settings.GOOGLE_SHEETS_TIMEOUT_SECONDS)
+            _gspread_client = client
+        return _gspread_client
+
+
+def get_worksheet(spreadsheet_id):
+    """The first worksheet of a spreadsheet; opened once, then served from the handle cache"""
+    with _sheets_lock:
+        worksheet = _worksheets.get(spreadsheet_id)
+    if worksheet is not None:
+        return worksheet
+    print(f"📄 Opening spreadsheet: {spreadsheet_id}")
+    worksheet = get_gspread_client().open_by_key(spreadsheet_id).sheet1
+    with _sheets_lock:
+        return _worksheets.setdefault(spreadsheet_id, worksheet)
+
+
+def forget_worksheet(spreadsheet_id):
+    """Drops a cached handle (e.g. after an API error), so the next write reopens the sheet"""
+    with _sheets_lock:
+        _worksheets.pop(spreadsheet_id, None)
+
+
+def append_sheet_row(spreadsheet_id, values):
+    """Appends one row to a spreadsheet's first worksheet"""
+    return append_sheet_rows(spreadsheet_id, [values])
+
+
+def append_sheet_rows(spreadsheet_id, rows):
+    """Appends rows to a spreadsheet's first worksheet in a single API request"""
+    worksheet = get_worksheet(spreadsheet_id)
+    try:
+        worksheet.append_rows(rows)
+    except Exception:
+        # The sheet may have been renamed, deleted or re-shared
+        forget_worksheet(spreadsheet_id)
+        raise
+    return worksheet
@@ -5,6 +5,13 @@ from dotenv import load_dotenv
 from google import genai
 from google.api_core.exceptions import ResourceExhausted
 import time
+import asyncio
+from . import http_client
+
+try:
+    import httpx
+except ImportError: # Optional: only AsyncVAPIService needs it
+    httpx = None
 
 load_dotenv()
 
@@ -120,9 +127,9 @@ class VAPIService:
 
 
 
-    def start_outbound_call(self, phone_number, db_tool_ids, file_ids=None, agent_name=None, agent_description=None, enabled_base_tool_ids=None):
+    def outbound_call_payload(self, phone_number, db_tool_ids, file_ids=None, agent_name=None, agent_description=None, enabled_base_tool_ids=None):
         """
-        Initiates an outbound call to a phone number.
+        Builds the /call request body for an outbound call.
         Uses agent_name and agent_description if provided.
         Uses enabled_base_tool_ids instead of default TOOL_ID if provided.
         """
@@ -219,13 +226,23 @@ class VAPIService:
             "phoneNumberId": self.phone_number_id,
             "customer": {"number": phone_number}
         }
+        return payload
+
+    def start_outbound_call(self, phone_number, db_tool_ids, file_ids=None, agent_name=None, agent_description=None, enabled_base_tool_ids=None):
+        """
+        Initiates an outbound call to a phone number.
+        Uses agent_name and agent_description if provided.
+        Uses enabled_base_tool_ids instead of default TOOL_ID if provided.
+        """
+        payload = self.outbound_call_payload(
+            phone_number, db_tool_ids, file_ids, agent_name, agent_description, enabled_base_tool_ids
+        )
 
         try:
-            res = requests.post(
+            res = http_client.post(
                 f"{self.base_url}/call",
                 headers=self.headers,
-                json=payload,
-                timeout=30
+                json=payload
             )
             res.raise_for_status()
             call_response = res.json()
@@ -236,14 +253,8 @@ class VAPIService:
             print(f"❌ Vapi API Error: {e.response.text}") # This is the golden ticket
             return None
 
-    def start_inbound_agent(self, db_tool_ids=None, file_ids=None, agent_name=None, agent_description=None, enabled_base_tool_ids=None):
-        """
-        Creates and activates an inbound agent that handles incoming calls.
-        Uses agent_name and agent_description if provided.
-        Uses enabled_base_tool_ids instead of default TOOL_ID if provided.
-        Returns the assistant ID if successful.
-        """
-        user_prompt = self.call_gemini("prompt need be edited for inbound agent")
+    def inbound_assistant_payload(self, user_prompt, db_tool_ids=None, file_ids=None, agent_name=None, agent_description=None, enabled_base_tool_ids=None):
+        """Builds the /assistant request body for the inbound agent"""
         if db_tool_ids is None:
             db_tool_ids = []
         if file_ids is None:
@@ -262,57 +273,69 @@ class VAPIService:
         print(f"🔧 Additional Tool IDs: {db_tool_ids}")
         print(f"📄 File IDs: {file_ids}")
 
-        try:
-            # INBOUND ASSISTANT (PERSISTENT)
-            inbound_assistant_payload = {
-                "name": f"{name}-Inbound",
-                "firstMessage": f"Namaste. I am {name}. How may I assist you today?",
-                "model": {
-                    "provider": "openai",
-                    "model": "gpt-4.1-nano",
-                    "toolIds": list(set(base_tools + db_tool_ids)),
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": f"You are {name}. {description} You are a polite government-style inbound assistant. Context: {self.llm_context}. Answer clearly and respectfully. Do not ask for sensitive personal information. If anything isn't found or accessed by your tools then refer to the knowledge base provided and give relevant information."
-                        },
-                        {
-                            "role": "user",
-                            "content": user_prompt
-                        }
-                    ],
-                    "temperature": 0.4
-                },
-                "voice": {"provider": "vapi", "voiceId": "Neha"},
-                "transcriber": {
-                    "language": "multi",
-                    "model": "nova-3",
-                    "provider": "deepgram"
-                },
-                "recordingEnabled": True,
-                "endCallMessage": "Thank you for calling. Have a good day.",
-                # Server configuration for webhook
-                "server": {
-                    "url": f"{DEPLOYED_URL}/api/vapi-webhook/"
-                },
-                "serverMessages": ["end-of-call-report"]
-            }
+        # INBOUND ASSISTANT (PERSISTENT)
+        inbound_assistant_payload = {
+            "name": f"{name}-Inbound",
+            "firstMessage": f"Namaste. I am {name}. How may I assist you today?",
+            "model": {
+                "provider": "openai",
+                "model": "gpt-4.1-nano",
+                "toolIds": list(set(base_tools + db_tool_ids)),
+                "messages": [
+                    {
+                        "role": "system",
+                        "content": f"You are {name}. {description} You are a polite government-style inbound assistant. Context: {self.llm_context}. Answer clearly and respectfully. Do not ask for sensitive personal information. If anything isn't found or accessed by your tools then refer to the knowledge base provided and give relevant information."
+                    },
+                    {
+                        "role": "user",
+                        "content": user_prompt
+                    }
+                ],
+                "temperature": 0.4
+            },
+            "voice": {"provider": "vapi", "voiceId": "Neha"},
+            "transcriber": {
+                "language": "multi",
+                "model": "nova-3",
+                "provider": "deepgram"
+            },
+            "recordingEnabled": True,
+            "endCallMessage": "Thank you for calling. Have a good day.",
+            # Server configuration for webhook
+            "server": {
+                "url": f"{DEPLOYED_URL}/api/vapi-webhook/"
+            },
+            "serverMessages": ["end-of-call-report"]
+        }
 
-            # Add knowledge base if file_ids are provided
-            if file_ids:
-                inbound_assistant_payload["knowledgeBases"] = [{
-                    "name": "government_knowledge_base",
-                    "provider": "google",
-                    "model": "gemini-2.0-flash",
-                    "description": "Government schemes and information knowledge base",
-                    "fileIds": file_ids
-                }]
+        # Add knowledge base if file_ids are provided
+        if file_ids:
+            inbound_assistant_payload["knowledgeBases"] = [{
+                "name": "government_knowledge_base",
+                "provider": "google",
+                "model": "gemini-2.0-flash",
+                "description": "Government schemes and information knowledge base",
+                "fileIds": file_ids
+            }]
+        return inbound_assistant_payload
+
+    def start_inbound_agent(self, db_tool_ids=None, file_ids=None, agent_name=None, agent_description=None, enabled_base_tool_ids=None):
+        """
+        Creates and activates an inbound agent that handles incoming calls.
+        Uses agent_name and agent_description if provided.
+        Uses enabled_base_tool_ids instead of default TOOL_ID if provided.
+        Returns the assistant ID if successful.
+        """
+        user_prompt = self.call_gemini("prompt need be edited for inbound agent")
+        try:
+            inbound_assistant_payload = self.inbound_assistant_payload(
+                user_prompt, db_tool_ids, file_ids, agent_name, agent_description, enabled_base_tool_ids
+            )
 
-            inbound_res = requests.post(
+            inbound_res = http_client.post(
                 f"{self.base_url}/assistant",
                 headers=self.headers,
-                json=inbound_assistant_payload,
-                timeout=30
+                json=inbound_assistant_payload
             )
             inbound_res.raise_for_status()
             inbound_assistant_id = inbound_res.json()["id"]
@@ -323,11 +346,10 @@ class VAPIService:
                 "assistantId": inbound_assistant_id
             }
 
-            attach_res = requests.patch(
+            attach_res = http_client.patch(
                 f"{self.base_url}/phone-number/{self.phone_number_id}",
                 headers=self.headers,
-                json=attach_payload,
-                timeout=30
+                json=attach_payload
             )
             attach_res.raise_for_status()
 
@@ -353,7 +375,7 @@ class VAPIService:
         try:
             # We pass the file object directly to requests
             files = {"file": (file_obj.name, file_obj.read(), file_obj.content_type)}
-            res = requests.post(url, headers=headers, files=files, timeout=60)
+            res = http_client.post(url, headers=headers, files=files, timeout=60)
             res.raise_for_status()
             return res.json() # Returns {'id': 'file-uuid-xxx', ...}
         except Exception as e:
@@ -361,9 +383,8 @@ class VAPIService:
             return None
         
 
-    def update_query_tool(self, file_ids):
-        url = f"{self.base_url}/tool/{TOOL_ID[0]}"
-        
+    def query_tool_payload(self, file_ids):
+        """Builds the PATCH body that points the knowledge-base query tool at file_ids"""
         payload = {
             "function": {
                 "name": "query_tool",
@@ -395,9 +416,14 @@ class VAPIService:
             }
             ],
         }
+        return payload
+
+    def update_query_tool(self, file_ids):
+        url = f"{self.base_url}/tool/{TOOL_ID[0]}"
+        payload = self.query_tool_payload(file_ids)
 
         try:
-            res = requests.patch(url, headers=self.headers, json=payload, timeout=30)
+            res = http_client.patch(url, headers=self.headers, json=payload)
             
             if res.status_code != 200:
                 print(f"❌ VAPI Error Detail: {res.text}")
@@ -441,7 +467,7 @@ class VAPIService:
                 }
             }
 
-            res = requests.post(url, headers=self.headers, json=payload)
+            res = http_client.post(url, headers=self.headers, json=payload)
             return res.json()
     
     def create_supabase_sql_tool(self, name, summary, columns, edge_function_url):
@@ -477,7 +503,7 @@ class VAPIService:
             }
         }
 
-        res = requests.post(url, headers=self.headers, json=payload)
+        res = http_client.post(url, headers=self.headers, json=payload)
         return res.json()
 
     def create_generic_tool(self, payload):
@@ -488,7 +514,7 @@ class VAPIService:
         
         # We send the payload as-is because we've already 
         # structured it correctly in the view.
-        res = requests.post(url, headers=self.headers, json=payload)
+        res = http_client.post(url, headers=self.headers, json=payload)
         
         if res.status_code in [200, 201]:
             return res.json()
@@ -532,7 +558,7 @@ class VAPIService:
         }
 
         try:
-            res = requests.post(url, headers=self.headers, json=payload, timeout=30)
+            res = http_client.post(url, headers=self.headers, json=payload)
             res.raise_for_status()
             tool_response = res.json()
             print(f"✅ TransferCall tool created successfully: {tool_response.get('id')}")
@@ -540,3 +566,122 @@ class VAPIService:
         except Exception as e:
             print(f"❌ TransferCall Tool Error: {e}")
             return {"error": str(e)}
+
+
+class AsyncVAPIService:
+    """
+    asyncio-native counterpart of VAPIService for the async views
+    (api/async_views.py): the control-path calls await Vapi and Gemini
+    instead of holding a worker thread. Its methods are coroutines, so it is
+    not a VAPIService subclass (inherited helpers calling them would get
+    un-awaited coroutines); it builds its payloads with a VAPIService
+    instead, so both stay in step.
+    """
+
+    def __init__(self):
+        self.payloads = VAPIService()
+        self.api_key = self.payloads.api_key
+        self.base_url = self.payloads.base_url
+        self.phone_number_id = self.payloads.phone_number_id
+        self.headers = self.payloads.headers
+
+    async def call_gemini(self, prompt: str, model="gemini-2.5-flash", retries=3) -> str:
+        for attempt in range(retries):
+            try:
+                print(f"🧠 Gemini call ({model}) attempt {attempt + 1}/{retries}")
+
+                response = await gemini_client.aio.models.generate_content(
+                    model=model,
+                    contents=prompt
+                )
+
+                if response.text:
+                    return response.text.strip()
+
+                raise ValueError("Empty Gemini response")
+
+            except ResourceExhausted:
+                wait = 2 ** attempt
+                print(f"⚠️ Gemini quota hit, retrying in {wait}s")
+                await asyncio.sleep(wait)
+
+            except Exception as e:
+                print("❌ Gemini error:", e)
+                break
+
+        # IMPORTANT: deterministic failure
+        return "{}"
+
+    async def start_outbound_call(self, phone_number, db_tool_ids, file_ids=None, agent_name=None, agent_description=None, enabled_base_tool_ids=None):
+        payload = self.payloads.outbound_call_payload(
+            phone_number, db_tool_ids, file_ids, agent_name, agent_description, enabled_base_tool_ids
+        )
+
+        try:
+            res = await http_client.async_post(f"{self.base_url}/call", headers=self.headers, json=payload)
+            res.raise_for_status()
+            call_response = res.json()
+            print(f"✅ Outbound call initiated successfully: {call_response.get('id')}")
+            return call_response
+
+        except httpx.HTTPStatusError as e:
+            print(f"❌ Vapi API Error: {e.response.text}")
+            return None
+
+    async def start_inbound_agent(self, db_tool_ids=None, file_ids=None, agent_name=None, agent_description=None, enabled_base_tool_ids=None):
+        user_prompt = await self.call_gemini("prompt need be edited for inbound agent")
+        try:
+            inbound_assistant_payload = self.payloads.inbound_assistant_payload(
+                user_prompt, db_tool_ids, file_ids, agent_name, agent_description, enabled_base_tool_ids
+            )
+
+            inbound_res = await http_client.async_post(
+                f"{self.base_url}/assistant", headers=self.headers, json=inbound_assistant_payload
+            )
+            inbound_res.raise_for_status()
+            inbound_assistant_id = inbound_res.json()["id"]
+            print(f"✅ Inbound assistant created with ID: {inbound_assistant_id}")
+
+            attach_res = await http_client.async_patch(
+                f"{self.base_url}/phone-number/{self.phone_number_id}",
+                headers=self.headers,
+                json={"assistantId": inbound_assistant_id}
+            )
+            attach_res.raise_for_status()
+
+            print(f"✅ Inbound agent attached to phone number successfully")
+            return {"id": inbound_assistant_id, "assistant_id": inbound_assistant_id}
+
+        except Exception as e:
+            print(f"❌ Inbound Agent Error: {e}")
+            import traceback
+            print(traceback.format_exc())
+            return None
+
+    async def upload_file(self, file_obj):
+        url = f"https://api.vapi.ai/file"
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+
+        try:
+            files = {"file": (file_obj.name, file_obj.read(), file_obj.content_type)}
+            res = await http_client.async_post(url, headers=headers, files=files, timeout=60)
+            res.raise_for_status()
+            return res.json() # Returns {'id': 'file-uuid-xxx', ...}
+        except Exception as e:
+            print(f"Vapi Upload Error: {e}")
+            return None
+
+    async def update_query_tool(self, file_ids):
+        url = f"{self.base_url}/tool/{TOOL_ID[0]}"
+
+        try:
+            res = await http_client.async_patch(url, headers=self.headers, json=self.payloads.query_tool_payload(file_ids))
+
+            if res.status_code != 200:
+                print(f"❌ VAPI Error Detail: {res.text}")
+
+            res.raise_for_status()
+            return True
+        except Exception as e:
+            print(f"Error syncing Tool: {e}")
+            return False
@@ -6,14 +6,20 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from django.utils import timezone
 from django.conf import settings
-from django.db import transaction
+from django.db import transaction, connection
+from django.db.models import F
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+import multiprocessing
+import threading
 import uuid
+import time
 import psycopg2
 import os
-from rapidfuzz import process, fuzz
 from .structured_output import ToolMetadata
-from .utils import deploy_supabase_edge_logic, fetch_google_sheet_as_df
-from .models import CallHistory, CallingSession, KnowledgeDocument, ConnectedDatabase, HumanExpert, AgentConfiguration
+from . import arrow_store, http_client, ingest, jobs, profiling, result_cache, result_shaper, row_store, schema_cache, search_index, sheet_outbox, tool_routing
+from .utils import append_sheet_row, deploy_supabase_edge_logic, fetch_google_sheet_as_df, get_worksheet
+from .models import CallHistory, CallingSession, KnowledgeDocument, ConnectedDatabase, HumanExpert, AgentConfiguration, IngestionJob
 from .serializers import CallHistorySerializer, CallingSessionSerializer
 from .vapi_service import VAPIService, sanitize_function_name
 from rest_framework.parsers import MultiPartParser, FormParser
@@ -21,8 +27,6 @@ import pandas as pd
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
 import requests
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 
 load_dotenv()
 
@@ -43,6 +47,70 @@ def get_llm():
         _structured_llm = _llm.with_structured_output(ToolMetadata)
     return _llm, _structured_llm
 
+# Shared pool for the tool calls of one Vapi message; see run_tool_calls
+_tool_call_pool = ThreadPoolExecutor(max_workers=settings.TOOL_CALL_MAX_WORKERS, thread_name_prefix='tool-call')
+
+
+def parse_tool_call(call):
+    """Returns (tool_call_id, vapi_tool_id, function_name, args) for a Vapi tool call"""
+    function = call.get('function', {})
+    args = function.get('arguments', {})
+    # Parse args if it's a string (common with Vapi)
+    if isinstance(args, str):
+        try:
+            args = json.loads(args)
+        except json.JSONDecodeError as e:
+            print(f"⚠️ Failed to parse args as JSON: {e}")
+            args = {}
+    return call.get('id'), call.get('toolId'), function.get('name', ''), args
+
+
+def run_tool_calls(tool_calls, handler):
+    """
+    Runs handler(call) for every tool call of a Vapi message and returns one
+    {"toolCallId", "result"} entry per call, in order. Several calls run
+    concurrently, so a turn takes as long as its slowest lookup.
+    """
+    def _run(call):
+        try:
+            return handler(call)
+        except Exception as e:
+            print(f"❌ Tool call {call.get('id')} failed: {e}")
+            return {"toolCallId": call.get('id'), "result": {"error": str(e)}}
+
+    if len(tool_calls) == 1:
+        return [_run(tool_calls[0])]
+
+    def _run_in_thread(call):
+        try:
+            return _run(call)
+        finally:
+            # Worker threads get their own DB connection; don't leak it
+            connection.close()
+
+    return list(_tool_call_pool.map(_run_in_thread, tool_calls))
+
+
+def run_concurrently(funcs):
+    """
+    Calls each of funcs with no arguments, concurrently when there are
+    several, and returns their results in order. The first exception is
+    re-raised once every call has finished.
+    """
+    if len(funcs) <= 1:
+        return [func() for func in funcs]
+
+    def _run_in_thread(func):
+        try:
+            return func()
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=len(funcs), thread_name_prefix='branch') as pool:
+        futures = [pool.submit(_run_in_thread, func) for func in funcs]
+    return [future.result() for future in futures]
+
+
 class CallHistoryViewSet(viewsets.ModelViewSet):
     """ViewSet for Call History"""
     
@@ -58,19 +126,12 @@ class CallHistoryViewSet(viewsets.ModelViewSet):
         return queryset
 
 
-@api_view(['POST'])
-def start_outbound_calling(request):
+def enabled_call_tools():
     """
-    Start outbound calling - initiates a call to a phone number.
-    Only includes tools that are enabled in agent configuration.
+    Returns (agent configuration, enabled base tool IDs, enabled dataset and
+    human expert tool IDs) for starting a call or the inbound agent.
     """
     from .vapi_service import TOOL_ID
-    
-    phone_number = request.data.get('phone_number')
-    file_ids = request.data.get('file_ids', [])
-    
-    if not phone_number:
-        return Response({'success': False, 'error': 'phone_number is required'}, status=400)
 
     # Get agent configuration and tool settings
     agent_config = AgentConfiguration.get_config()
@@ -99,8 +160,24 @@ def start_outbound_calling(request):
     
     # Combine all enabled tools
     all_tool_ids = dynamic_tool_ids + human_expert_tool_ids
-    print(f"📞 Starting outbound call with enabled tool IDs: {enabled_base_tool_ids + all_tool_ids}")
     print(f"👤 Human Expert Tool IDs: {human_expert_tool_ids}")
+    return agent_config, enabled_base_tool_ids, all_tool_ids
+
+
+@api_view(['POST'])
+def start_outbound_calling(request):
+    """
+    Start outbound calling - initiates a call to a phone number.
+    Only includes tools that are enabled in agent configuration.
+    """
+    phone_number = request.data.get('phone_number')
+    file_ids = request.data.get('file_ids', [])
+    
+    if not phone_number:
+        return Response({'success': False, 'error': 'phone_number is required'}, status=400)
+
+    agent_config, enabled_base_tool_ids, all_tool_ids = enabled_call_tools()
+    print(f"📞 Starting outbound call with enabled tool IDs: {enabled_base_tool_ids + all_tool_ids}")
     print(f"🤖 Using Agent: {agent_config.name}")
 
     service = VAPIService()
@@ -133,39 +210,10 @@ def start_inbound_agent(request):
     Start inbound agent - creates and activates an assistant to handle incoming calls.
     Only includes tools that are enabled in agent configuration.
     """
-    from .vapi_service import TOOL_ID
-    
     file_ids = request.data.get('file_ids', [])
 
-    # Get agent configuration and tool settings
-    agent_config = AgentConfiguration.get_config()
-    tool_settings = agent_config.tool_settings or {}
-    
-    # Helper function to check if a tool is enabled
-    def is_tool_enabled(tool_id):
-        return tool_settings.get(tool_id, {}).get('enabled', True)  # Default enabled
-
-    # Get all database tool IDs (filtered by enabled status)
-    all_db_records = ConnectedDatabase.objects.all()
-    dynamic_tool_ids = []
-    for record in all_db_records:
-        for tool_id in record.vapi_tool_ids:
-            if is_tool_enabled(tool_id):
-                dynamic_tool_ids.append(tool_id)
-
-    # Get all active human expert transfer tool IDs (filtered by enabled status)
-    human_expert_tool_ids = []
-    for expert in HumanExpert.objects.filter(is_active=True):
-        if is_tool_enabled(expert.vapi_tool_id):
-            human_expert_tool_ids.append(expert.vapi_tool_id)
-    
-    # Filter base TOOL_IDs based on enabled status
-    enabled_base_tool_ids = [tid for tid in TOOL_ID if is_tool_enabled(tid)]
-    
-    # Combine all enabled tools
-    all_tool_ids = dynamic_tool_ids + human_expert_tool_ids
+    agent_config, enabled_base_tool_ids, all_tool_ids = enabled_call_tools()
     print(f"📞 Starting inbound agent with enabled tool IDs: {enabled_base_tool_ids + all_tool_ids}")
-    print(f"👤 Human Expert Tool IDs: {human_expert_tool_ids}")
     print(f"🤖 Using Agent: {agent_config.name}")
 
     service = VAPIService()
@@ -278,65 +326,207 @@ def upload_document(request):
 @api_view(['POST'])
 @parser_classes([MultiPartParser, FormParser])
 def connect_database(request):
+    """Queues a CSV / Excel ingestion job; poll ingestion-jobs/<job_id>/ for progress"""
     source_type = request.data.get('source_type')
     can_read = request.data.get('can_read') == 'true'
     file_obj = request.FILES.get('file')
+    search_engine = request.data.get('search_engine', 'index')
+    refresh_summary = request.data.get('refresh_summary') == 'true' # Skip the schema-summary cache
+    if search_engine not in search_index.SEARCH_ENGINES:
+        return Response({'success': False, 'error': f'Unknown or unavailable search_engine: {search_engine}'}, status=400)
+    if file_obj is None:
+        return Response({'success': False, 'error': 'No file uploaded'}, status=400)
+
+    job = jobs.create_job(source_type, file_obj.name)
+    upload_path = jobs.save_upload(file_obj)
+    payload = jobs.job_payload(job) # Before the worker starts updating job
+    jobs.submit(job, run_file_ingestion, upload_path, file_obj.name, source_type, can_read, search_engine, refresh_summary)
+    return Response({'success': True, **payload}, status=202)
+
+
+def run_file_ingestion(job, upload_path, file_name, source_type, can_read, search_engine, refresh_summary=False):
+    """Ingestion job body for connect_database; returns the job result"""
+    try:
+        with open(upload_path, 'rb') as file_obj:
+            return _ingest_file(job, file_obj, file_name, source_type, can_read, search_engine, refresh_summary)
+    finally:
+        os.remove(upload_path)
+
+
+@api_view(['POST'])
+@parser_classes([MultiPartParser, FormParser])
+def connect_database_bulk(request):
+    """
+    Queues one ingestion job per uploaded CSV / Excel file (repeat the
+    'files' field). Files are parsed in a process pool and summarized a few
+    at a time; each gets its own ConnectedDatabase and read tool. Poll
+    ingestion-jobs/<job_id>/ for each file's status and stage timings.
+    """
+    files = request.FILES.getlist('files')
+    can_read = request.data.get('can_read') == 'true'
+    search_engine = request.data.get('search_engine', 'index')
+    refresh_summary = request.data.get('refresh_summary') == 'true' # Skip the schema-summary cache
+    if search_engine not in search_index.SEARCH_ENGINES:
+        return Response({'success': False, 'error': f'Unknown or unavailable search_engine: {search_engine}'}, status=400)
+    if not files:
+        return Response({'success': False, 'error': 'No files uploaded'}, status=400)
+    if len(files) > settings.BULK_INGEST_MAX_FILES:
+        return Response({'success': False, 'error': f'At most {settings.BULK_INGEST_MAX_FILES} files per request'}, status=400)
+
+    batch = []
+    uploads = []
+    rejected = []
+    for file_obj in files:
+        source_type = ingest.source_type_for(file_obj.name)
+        if source_type is None:
+            rejected.append({'name': file_obj.name, 'status': 'rejected', 'error': 'Unsupported file type (expected .csv, .xlsx or .xls)'})
+            continue
+        batch.append(jobs.create_job(source_type, file_obj.name))
+        uploads.append((jobs.save_upload(file_obj), file_obj.name, source_type))
+
+    payloads = [jobs.job_payload(job) for job in batch] # Before the workers start updating the jobs
+    if not batch:
+        return Response({'success': False, 'jobs': [], 'rejected': rejected}, status=400)
+    jobs.submit_batch(batch, run_bulk_file_ingestion, uploads, can_read, search_engine, refresh_summary)
+    return Response({'success': True, 'jobs': payloads, 'rejected': rejected}, status=202)
+
+
+def run_bulk_file_ingestion(batch, uploads, can_read, search_engine, refresh_summary=False):
+    """
+    Ingestion batch body for connect_database_bulk. uploads holds one
+    (upload_path, file_name, source_type) per job of batch.
+    """
+    # One file's rows are stored at a time: concurrent bulk inserts would only queue on SQLite's write lock
+    store_lock = threading.Lock()
+
+    def _finish(job, parsed, file_name, source_type):
+        columns, sample, rows, seconds = parsed.result()
+        jobs.record_stage(job, 'parsed', seconds)
+        print(f"📊 Parsed {file_name}: {len(columns)} columns, {len(rows)} rows")
+        return _store_file_dataset(
+            job, file_name, source_type, columns, sample, rows[:settings.INGEST_CHUNK_ROWS], rows,
+            can_read, search_engine, refresh_summary, store_lock,
+        )
+
+    # A parsed file holds all of its rows: only parse as many as the LLM threads can take,
+    # so finished parses never pile up in memory waiting for a thread
+    in_flight = threading.BoundedSemaphore(settings.BULK_INGEST_LLM_WORKERS)
+
+    def _run_in_thread(job, parsed, file_name, source_type):
+        try:
+            jobs.run_job(job, _finish, parsed, file_name, source_type)
+        finally:
+            connection.close()
+            in_flight.release()
+
+    try:
+        # Parsing is CPU-bound: spread it over processes ('spawn', so no DB connection is inherited);
+        # summaries and tool creation wait on the network, so a few threads overlap them
+        parse_workers = max(1, min(len(uploads), settings.BULK_INGEST_PARSE_PROCESSES, settings.BULK_INGEST_LLM_WORKERS))
+        with ProcessPoolExecutor(max_workers=parse_workers, mp_context=multiprocessing.get_context('spawn')) as parse_pool, \
+                ThreadPoolExecutor(max_workers=settings.BULK_INGEST_LLM_WORKERS, thread_name_prefix='bulk') as llm_pool:
+            for job, (upload_path, file_name, source_type) in zip(batch, uploads):
+                in_flight.acquire() # Released once an earlier file is stored
+                parsed = parse_pool.submit(ingest.parse_upload, upload_path, source_type, settings.INGEST_CHUNK_ROWS)
+                llm_pool.submit(_run_in_thread, job, parsed, file_name, source_type)
+    finally:
+        for upload_path, _, _ in uploads:
+            if os.path.exists(upload_path):
+                os.remove(upload_path)
+
+
+def _ingest_file(job, file_obj, file_name, source_type, can_read, search_engine, refresh_summary=False):
+    # 1. Parse File: only the first chunk is read here; the rest streams in at step 4
+    with jobs.stage(job, 'parsed'):
+        upload = ingest.UploadPreview(file_obj, source_type)
+
+    print(f"📊 Read header and first chunk: {len(upload.columns)} columns")
+    return _store_file_dataset(
+        job, file_name, source_type, upload.columns, upload.sample, upload.preview_rows(), upload.iter_rows(),
+        can_read, search_engine, refresh_summary,
+    )
+
+
+def _store_file_dataset(job, file_name, source_type, columns, sample, preview_rows, rows, can_read, search_engine,
+                        refresh_summary=False, store_lock=None):
+    """
+    Profiles, summarizes a parsed file, creates its read tool, stores its
+    rows and warms its index. preview_rows (the first chunk) feed the
+    summary prompt; rows is every row, the first chunk included.
+    """
+    # Column stats of the first chunk, for a shorter and more precise prompt
+    with jobs.stage(job, 'profiled'):
+        preview_profile = profiling.profile_rows(preview_rows)
 
-    # 1. Parse File
-    if source_type == 'csv':
-        df = pd.read_csv(file_obj)
-    else:
-        df = pd.read_excel(file_obj)
-    
-    print(f"📊 Loaded DataFrame with shape: {df.shape}")
     # 2. Generate Semantic Summary with Gemini
-    columns = df.columns.tolist()
-    sample = df.head(3).to_string()
 
     # 2. Generate Structured Output using LangChain
-    try:
-        _, structured_llm = get_llm()
-        ai_response = structured_llm.invoke(
-            f"Analyze this dataset (Filename: {file_obj.name}). "
-            f"Columns: {columns}. Sample Data: {sample}"
-        )
-        
-        db_tool_name = ai_response.tool_name
-        db_summary = ai_response.summary
-        
-    except Exception as e:
-        print(f"⚠️ LangChain Structured Output failed: {e}")
-        db_tool_name = "".join(x for x in file_obj.name.split('.')[0] if x.isalnum())
-        db_summary = f"Database containing: {', '.join(columns)}"
+    with jobs.stage(job, 'summarized'):
+        try:
+            # Known schemas are answered from the schema-summary cache
+            ai_response = schema_cache.analyze(
+                'dataset', columns, sample,
+                f"Analyze this dataset (Filename: {file_name}). "
+                f"Columns: {profiling.describe_columns(preview_profile)}",
+                lambda prompt: get_llm()[1].invoke(prompt),
+                bypass=refresh_summary,
+            )
+
+            db_tool_name = ai_response.tool_name
+            db_summary = ai_response.summary
+
+        except Exception as e:
+            print(f"⚠️ LangChain Structured Output failed: {e}")
+            db_tool_name = "".join(x for x in file_name.split('.')[0] if x.isalnum())
+            db_summary = f"Database containing: {', '.join(columns)}"
     
     print(f"🛠️ Tool Name: {db_tool_name}")
     print(f"📝 Summary: {db_summary}")
     # 3. Create Tools in Vapi
-    service = VAPIService()
-    tool_ids = []
+    with jobs.stage(job, 'tools_created'):
+        service = VAPIService()
+        tool_ids = []
+        bindings = [] # (tool id, kind, function name) for the tool-routing table
 
-    if can_read:
-        tool = service.create_db_function_tool(db_tool_name, db_summary, columns, "read")
-        if tool and 'id' in tool:
-            print(f"✅ Created READ tool with ID: {tool['id']}")
-            tool_ids.append(tool['id'])
-
-    # 4. Save to Django DB
-    ConnectedDatabase.objects.create(
-        name=db_tool_name,
-        source_type=source_type,
-        summary=db_summary,
-        columns=columns,
-        vapi_tool_ids=tool_ids,
-        data=df.to_dict(orient='records')
-    )
+        if can_read:
+            tool = service.create_db_function_tool(db_tool_name, db_summary, columns, "read")
+            if tool and 'id' in tool:
+                print(f"✅ Created READ tool with ID: {tool['id']}")
+                tool_ids.append(tool['id'])
+                bindings.append((tool['id'], 'read', sanitize_function_name(db_tool_name)))
 
-    return Response({
+    # 4. Save to Django DB, bulk-inserting the rows chunk by chunk as they are read
+    # and profiling every row on the way
+    profiler = profiling.ColumnProfiler()
+    with store_lock or nullcontext(), jobs.stage(job, 'stored'):
+        with transaction.atomic():
+            db_record = ConnectedDatabase.objects.create(
+                name=db_tool_name,
+                source_type=source_type,
+                summary=db_summary,
+                columns=columns,
+                vapi_tool_ids=tool_ids,
+                search_engine=search_engine,
+            )
+            for tool_id, kind, function_name in bindings:
+                tool_routing.bind(db_record, tool_id, kind, function_name)
+            row_count = row_store.insert_rows(db_record, profiler.track(rows))
+            db_record.column_profile = profiler.profile()
+            db_record.save(update_fields=['column_profile'])
+        job.database = db_record
+        job.save(update_fields=['database', 'updated_at'])
+    print(f"📥 Stored {row_count} rows for {db_tool_name}")
+    # 5. Warm the search index so the first tool call skips the build
+    with jobs.stage(job, 'indexed'):
+        search_index.build_index(db_record)
+
+    return {
         'success': True,
         'tool_name': db_tool_name,
         'summary': db_summary,
-        'tools_created': tool_ids
-    })
+        'tools_created': tool_ids,
+        'rows': row_count,
+    }
 
 
 @api_view(['POST'])
@@ -452,20 +642,18 @@ def execute_db_query(request):
     
     if not tool_calls:
         return Response({"error": "No tool call provided"}, status=400)
-    
-    call = tool_calls[0]
-    tool_call_id = call.get('id') 
-    vapi_tool_id = call.get('toolId') # The unique ID Vapi assigned to the tool
-    function_name = call.get('function', {}).get('name', '')
-    
-    args = call.get('function', {}).get('arguments', {})
-    if isinstance(args, str):
-        try:
-            args = json.loads(args)
-        except:
-            args = {}
+
+    results = run_tool_calls(tool_calls, run_db_query_call)
+    return Response({"results": results}, status=200)
+
+
+def run_db_query_call(call):
+    """Answers one read tool call; returns its Vapi results entry"""
+    # vapi_tool_id is the unique ID Vapi assigned to the tool
+    tool_call_id, vapi_tool_id, function_name, args = parse_tool_call(call)
 
     search_query = str(args.get('search_query', '')).strip()
+    target_column = str(args.get('target_column') or '').strip()
 
     # 1. CLEAN THE NAME: Strip search_, read_, and write_
     # This ensures "search_delhi_jal_board" becomes "delhi_jal_board"
@@ -475,55 +663,92 @@ def execute_db_query(request):
 
     try:
         # 2. MATCHING STRATEGY:
-        # First try matching the Tool ID (Best Practice)
-        db_record = ConnectedDatabase.objects.filter(vapi_tool_ids__contains=[vapi_tool_id]).first()
+        # First the tool-binding table, by Tool ID or function name (see api/tool_routing.py)
+        db_record = tool_routing.resolve(vapi_tool_id, function_name, 'read')
         
-        # If not found by ID, match by cleaned name
+        # If the tool isn't bound, match by cleaned name and bind it for the next call
         if not db_record:
             db_record = ConnectedDatabase.objects.filter(name__iexact=db_name_cleaned).first()
+            if db_record:
+                tool_routing.bind(db_record, vapi_tool_id, 'read', function_name)
 
         if not db_record:
             print(f"❌ Database match failed for: {db_name_cleaned}")
             raise ConnectedDatabase.DoesNotExist
 
-        rows = db_record.data
-        final_data = None
-
         # 3. SEARCH LOGIC
-        # Exact Match Check
-        for row in rows:
-            if any(str(val).lower() == search_query.lower() for val in row.values()):
-                final_data = {"results": [row], "match_type": "exact"}
-                break
-
-        # Fuzzy Match Check (if exact match fails)
-        if not final_data:
-            row_strings = [" ".join(str(v) for v in r.values()) for r in rows]
-            matches = process.extract(search_query, row_strings, scorer=fuzz.partial_ratio, limit=3, score_cutoff=60)
-            results = [rows[match[2]] for match in matches]
-            final_data = {"results": results, "status": "success" if results else "not_found"}
-
-        vapi_response = {
-            "results": [
-                {
-                    "toolCallId": tool_call_id,
-                    "result": final_data
-                }
-            ]
-        }
-
-        print(f"✅ Success: Found {len(final_data.get('results', []))} results")
-        return Response(vapi_response, status=200)
+        def _search():
+            index = search_index.get_cached_index(db_record)
+            cacheable = index is not None
+            if index is None:
+                # Cold worker: score only the candidate rows the database's own search
+                # index returns, and build the in-memory index in the background.
+                # Candidate-only answers are not cached.
+                search_index.warm_index_async(db_record)
+                index = search_index.DatasetIndex(row_store.candidate_rows(db_record, search_query))
+            data = search_index.run_search(index, search_query, target_column)
+            # Only the relevant columns, within the payload budget, go back to the LLM
+            return result_shaper.shape_result(db_record, data, search_query, target_column), cacheable
+
+        # Repeated and concurrent identical lookups share one search
+        final_data = result_cache.get_or_compute(db_record, search_query, target_column, _search)
+        result_shaper.record_sent(final_data)
+
+        print(f"✅ Success: Found {len(final_data.get('results', []))} results ({result_shaper.payload_size(final_data)} bytes) | Result cache: {result_cache.cache_stats()}")
+        return {"toolCallId": tool_call_id, "result": final_data}
 
     except ConnectedDatabase.DoesNotExist:
-        return Response({
-            "results": [{
-                "toolCallId": tool_call_id,
-                "result": {"error": f"Database '{db_name_cleaned}' not found in Sahayaki system."}
-            }]
-        }, status=200)
+        return {
+            "toolCallId": tool_call_id,
+            "result": {"error": f"Database '{db_name_cleaned}' not found in Sahayaki system."}
+        }
     
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def get_search_stats(request):
+    """Reports this worker's search index cache and tool result payload statistics"""
+    return Response({
+        'success': True,
+        'index_cache': search_index.cache_stats(),
+        'tool_results': result_shaper.payload_stats(),
+        'result_cache': result_cache.cache_stats(),
+        'tool_routing': tool_routing.routing_stats(),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def get_sheet_write_stats(request):
+    """Reports the Google Sheets write-behind queue depth and this worker's flush metrics"""
+    return Response({
+        'success': True,
+        'write_behind': settings.SHEET_WRITE_BEHIND,
+        'outbox': sheet_outbox.outbox_stats(),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def get_http_stats(request):
+    """Reports this worker's outbound HTTP requests per endpoint: latency, retries and errors"""
+    return Response({
+        'success': True,
+        'endpoints': http_client.http_stats(),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def get_ingestion_job(request, job_id):
+    """Reports an ingestion job's status, last completed stage and per-stage timings"""
+    try:
+        job = IngestionJob.objects.get(id=job_id)
+    except IngestionJob.DoesNotExist:
+        return Response({'success': False, 'error': 'Ingestion job not found'}, status=404)
+    return Response({'success': True, **jobs.job_payload(job)})
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_connected_databases(request):
@@ -536,12 +761,12 @@ def get_connected_databases(request):
         databases = ConnectedDatabase.objects.all()
         
         # Prepare the response data
-        # We include the name and the JSON data stored in the 'data' field
+        # We include the name and the rows stored for each database
         payload = [
             {
                 "id": db.id,
                 "name": db.name,
-                "data": db.data  # The list of dictionaries from Excel/CSV
+                "data": row_store.load_rows(db)  # The list of dictionaries from Excel/CSV
             } for db in databases
         ]
         
@@ -553,6 +778,53 @@ def get_connected_databases(request):
         return Response({"error": "Failed to retrieve databases"}, status=500)
 
 
+@api_view(['PUT', 'PATCH'])
+@permission_classes([AllowAny])
+def update_database_settings(request):
+    """
+    Updates per-database search settings: the search_engine, and the
+    display_columns always returned to the assistant with search results.
+    Bumps data_version so every worker rebuilds its index with the new settings.
+    """
+    db_id = request.data.get('id')
+    search_engine = request.data.get('search_engine')
+    display_columns = request.data.get('display_columns')
+
+    try:
+        db = ConnectedDatabase.objects.get(id=db_id)
+    except (ConnectedDatabase.DoesNotExist, ValueError):
+        return Response({'success': False, 'error': 'Database not found'}, status=404)
+
+    if search_engine is not None:
+        if search_engine not in search_index.SEARCH_ENGINES:
+            return Response({'success': False, 'error': f'Unknown or unavailable search_engine: {search_engine}'}, status=400)
+        db.search_engine = search_engine
+
+    if display_columns is not None:
+        if not isinstance(display_columns, list):
+            return Response({'success': False, 'error': 'display_columns must be a list of column names'}, status=400)
+        unknown = [column for column in display_columns if column not in db.columns]
+        if unknown:
+            return Response({'success': False, 'error': f'Unknown display_columns: {unknown}'}, status=400)
+        db.display_columns = display_columns
+
+    # Every worker rebuilds its index with the new settings instead of delta-merging
+    db.data_version = F('data_version') + 1
+    db.rows_rewritten_version = F('data_version') + 1
+    db.save(update_fields=['search_engine', 'display_columns', 'data_version', 'rows_rewritten_version'])
+    db.refresh_from_db(fields=['data_version', 'rows_rewritten_version'])
+    search_index.drop_index(db.id)
+    result_cache.invalidate(db.id)
+    print(f"⚙️ Updated search settings for {db.name}: engine={db.search_engine}, display_columns={db.display_columns}")
+
+    return Response({
+        'success': True,
+        'id': db.id,
+        'search_engine': db.search_engine,
+        'display_columns': db.display_columns,
+    })
+
+
 @api_view(['DELETE'])
 @permission_classes([AllowAny])
 def delete_database(request):
@@ -560,12 +832,18 @@ def delete_database(request):
     
     try:
         db_records = ConnectedDatabase.objects.filter(name=db_name)
-        count = db_records.count()
+        db_ids = list(db_records.values_list('id', flat=True))
+        count = len(db_ids)
         
         if count == 0:
             return Response({"error": "Database not found"}, status=404)
         
         db_records.delete()
+        for db_id in db_ids:
+            search_index.drop_index(db_id)
+            result_cache.invalidate(db_id)
+            arrow_store.delete_dataset_files(db_id)
+            tool_routing.forget_database(db_id)
         print(f"🗑️ Purged {count} record(s) with name '{db_name}' from local storage.")
         
         return Response({
@@ -766,18 +1044,30 @@ def vapi_webhook(request):
 @api_view(['POST'])
 @parser_classes([MultiPartParser, FormParser])
 def connect_supabase(request):
-    # Extract data from the request
-    user_token = request.data.get('access_token')
-    host = request.data.get('host')
-    database = request.data.get('database')
-    username = request.data.get('username')
-    password = request.data.get('password')
-    port = request.data.get('port')
-    table_name = request.data.get('table_name')
-    can_read = request.data.get('can_read') == 'true'
+    """Queues a Supabase table ingestion job; poll ingestion-jobs/<job_id>/ for progress"""
+    # Plain dict: the QueryDict must outlive the request
+    params = request.data.dict() if hasattr(request.data, 'dict') else dict(request.data)
+    job = jobs.create_job('supabase', params.get('table_name', ''))
+    payload = jobs.job_payload(job) # Before the worker starts updating job
+    jobs.submit(job, run_supabase_ingestion, params)
+    return Response({'success': True, **payload}, status=202)
 
-    try:
-        # 1. VERIFY & ANALYZE: Connect to Supabase to fetch column metadata
+
+def run_supabase_ingestion(job, params):
+    """Ingestion job body for connect_supabase; returns the job result"""
+    # Extract data from the request
+    user_token = params.get('access_token')
+    host = params.get('host')
+    database = params.get('database')
+    username = params.get('username')
+    password = params.get('password')
+    port = params.get('port')
+    table_name = params.get('table_name')
+    can_read = params.get('can_read') == 'true'
+    refresh_summary = params.get('refresh_summary') == 'true' # Skip the schema-summary cache
+
+    # 1. VERIFY & ANALYZE: Connect to Supabase to fetch column metadata
+    with jobs.stage(job, 'parsed'):
         conn = psycopg2.connect(
             host=host,
             database=database,
@@ -786,7 +1076,7 @@ def connect_supabase(request):
             port=port,
             connect_timeout=5
         )
-        
+
         # Get columns and a small sample for Gemini analysis
         cursor = conn.cursor()
         cursor.execute(f"SELECT * FROM {table_name} LIMIT 3")
@@ -797,33 +1087,38 @@ def connect_supabase(request):
         cursor.close()
         conn.close()
 
-        print(f"📡 Connected to Supabase table: {table_name}")
+    print(f"📡 Connected to Supabase table: {table_name}")
 
-        # 2. GENERATE SEMANTIC SUMMARY: Structured Output using LangChain & Gemini
+    # 2. GENERATE SEMANTIC SUMMARY: Structured Output using LangChain & Gemini
+    with jobs.stage(job, 'summarized'):
         try:
-            _, structured_llm = get_llm()
-            ai_response = structured_llm.invoke(
+            ai_response = schema_cache.analyze(
+                'sql_table', columns, sample_data_string,
                 f"Analyze this SQL table (Table: {table_name}). "
-                f"Columns: {columns}. Sample Data: {sample_data_string}"
+                f"Columns: {columns}. Sample Data: {sample_data_string}",
+                lambda prompt: get_llm()[1].invoke(prompt),
+                bypass=refresh_summary,
             )
-            
+
             db_tool_name = ai_response.tool_name
             db_summary = ai_response.summary
-            
+
         except Exception as e:
             print(f"⚠️ LangChain Structured Output failed: {e}")
             db_tool_name = f"query_{table_name.lower()}"
             db_summary = f"SQL Database containing: {', '.join(columns)}"
 
-        print(f"🛠️ AI Tool Name: {db_tool_name}")
-        print(f"📝 AI Summary: {db_summary}")
+    print(f"🛠️ AI Tool Name: {db_tool_name}")
+    print(f"📝 AI Summary: {db_summary}")
 
-        # 3. DEPLOY: Trigger Supabase Edge Function Registration
-        # We pass the user's token to deploy the logic directly to their project
-        edge_function_url = deploy_supabase_edge_logic(request.data, user_token)
-        print(f"🚀 Edge Function deployed at: {edge_function_url}")
+    # 3. DEPLOY: Trigger Supabase Edge Function Registration
+    # We pass the user's token to deploy the logic directly to their project
+    with jobs.stage(job, 'deployed'):
+        edge_function_url = deploy_supabase_edge_logic(params, user_token)
+    print(f"🚀 Edge Function deployed at: {edge_function_url}")
 
-        # 4. CREATE TOOLS: Register the tool in Vapi pointing to the Edge Function
+    # 4. CREATE TOOLS: Register the tool in Vapi pointing to the Edge Function
+    with jobs.stage(job, 'tools_created'):
         service = VAPIService()
         tool_ids = []
 
@@ -839,127 +1134,185 @@ def connect_supabase(request):
                 print(f"✅ Created Vapi SQL tool with ID: {tool['id']}")
                 tool_ids.append(tool['id'])
 
-        # 5. SAVE TO DJANGO DB: Store the connection metadata
-        ConnectedDatabase.objects.create(
+    # 5. SAVE TO DJANGO DB: Store the connection metadata
+    with jobs.stage(job, 'stored'):
+        db_record = ConnectedDatabase.objects.create(
             name=db_tool_name,
             source_type="SUPABASE",
             summary=db_summary,
             columns=columns,
             vapi_tool_ids=tool_ids,
-            # We store a "Live Connection" marker instead of raw data for SQL
-            data=[{"status": "Live SQL Connection", "table": table_name, "endpoint": edge_function_url}],
         )
-
-        return Response({
-            'success': True,
-            'tool_name': db_tool_name,
-            'summary': db_summary,
-            'tools_created': tool_ids,
-            'edge_url': edge_function_url
-        })
-
-    except Exception as e:
-        print(f"❌ Supabase Integration Error: {str(e)}")
-        return Response({"error": str(e)}, status=500)
+        for tool_id in tool_ids:
+            tool_routing.bind(db_record, tool_id, 'read', sanitize_function_name(f"query_{db_tool_name}"))
+        # We store a "Live Connection" marker row instead of raw data for SQL
+        row_store.append_row(db_record, {"status": "Live SQL Connection", "table": table_name, "endpoint": edge_function_url})
+        job.database = db_record
+        job.save(update_fields=['database', 'updated_at'])
+
+    return {
+        'success': True,
+        'tool_name': db_tool_name,
+        'summary': db_summary,
+        'tools_created': tool_ids,
+        'edge_url': edge_function_url
+    }
     
 
 @api_view(['POST'])
 def connect_google_sheets(request):
+    """Queues a Google Sheets ingestion job; poll ingestion-jobs/<job_id>/ for progress"""
     data = request.data
     sheet_url = data.get('sheet_url')
     db_name = data.get('name', 'Google_Sheet_DB')
     can_read = data.get('can_read') == 'true'
     can_write = data.get('can_write') == 'true'
+    refresh_summary = data.get('refresh_summary') == 'true' # Skip the schema-summary cache
 
     # 1. Extract Spreadsheet ID
-    match = re.search(r"/d/([a-zA-Z0-9-_]+)", sheet_url)
+    match = re.search(r"/d/([a-zA-Z0-9-_]+)", sheet_url or '')
     if not match:
         return Response({"error": "Invalid Google Sheet URL format."}, status=400)
     
     spreadsheet_id = match.group(1)
+    job = jobs.create_job('googlesheets', db_name)
+    payload = jobs.job_payload(job) # Before the worker starts updating job
+    jobs.submit(job, run_google_sheets_ingestion, spreadsheet_id, db_name, can_read, can_write, refresh_summary)
+    return Response({'success': True, **payload}, status=202)
+
+
+def run_google_sheets_ingestion(job, spreadsheet_id, db_name, can_read, can_write, refresh_summary=False):
+    """Ingestion job body for connect_google_sheets; returns the job result"""
     vapi_service = VAPIService()
     tool_ids = []
     columns = []
     df_data = []
 
-    try:
-        # Fetch initial data for LLM analysis
+    # Fetch initial data for LLM analysis
+    with jobs.stage(job, 'parsed'):
         df, columns = fetch_google_sheet_as_df(spreadsheet_id)
         sample_data = df.head(5).to_string()
-        _, structured_llm = get_llm()
-
-        # 2. READ LOGIC: Analysis for Information Retrieval
+        records = df.to_dict(orient='records')
         if can_read:
-            read_prompt = (
-                f"Identify the KNOWLEDGE BASE purpose of this sheet: {db_name}\n"
-                f"Columns: {columns}\nSample: {sample_data}\n"
-                "Create a description explaining what information can be RETRIEVED from here."
-            )
-            read_analysis = structured_llm.invoke(read_prompt)
-            read_desc = read_analysis.summary
-            
-            df_data = df.to_dict(orient='records')
-            # The search tool name always keeps the 'search_' prefix for the backend router
-            # Note: sanitization happens inside create_db_function_tool
-            read_tool = vapi_service.create_db_function_tool(
-                f"search_{db_name.lower().replace(' ', '_')}", 
-                f"SEARCH TOOL: {read_desc}", 
-                columns, 
-                "read"
-            )
-            if 'id' in read_tool:
-                tool_ids.append(read_tool['id'])
-
-        # 3. WRITE LOGIC: Specialized Analysis for Data Entry
-        if can_write:
-            write_prompt = (
-                f"This is a DATA ENTRY tool for the sheet: {db_name}\n"
-                f"Columns: {columns}\nSample: {sample_data}\n"
-                "Explain to the Voice AI exactly what it needs to ask the user to fill these columns. "
-                "Include instructions on being brief and capturing specific details."
-            )
-            write_analysis = structured_llm.invoke(write_prompt)
-            
-            # Use the AI to generate a clean, action-oriented function name
-            # Sanitize to meet Vapi requirements: /^[a-zA-Z0-9_-]{1,64}$/
-            write_func_name = sanitize_function_name(f"log_{db_name.lower().replace(' ', '_')}")
-            write_desc = f"APPEND TOOL: {write_analysis.summary}"
-
-            write_payload = {
-                "type": "function",
-                "function": {
-                    "name": write_func_name,
-                    "description": write_desc,
-                    "parameters": {
-                        "type": "object",
-                        "properties": {col: {"type": "string", "description": f"Caller's {col}"} for col in columns},
-                        "required": columns[:2] # Heuristic: Name and Description/Issue usually first
-                    }
-                },
-                "server": {
-                    "url": f"{DEPLOYED_URL}/api/execute_sheet_write",
+            df_data = records
+
+    with jobs.stage(job, 'profiled'):
+        column_profile = profiling.profile_rows(records)
+        described_columns = profiling.describe_columns(column_profile)
+
+    step_timings = {}
+
+    def _timed(step, func):
+        started = time.perf_counter()
+        try:
+            return func()
+        finally:
+            step_timings[step] = round(time.perf_counter() - started, 3)
+
+    # 2. READ LOGIC: Analysis for Information Retrieval, then the search tool
+    def read_branch():
+        read_prompt = (
+            f"Identify the KNOWLEDGE BASE purpose of this sheet: {db_name}\n"
+            f"Columns: {described_columns}\n"
+            "Create a description explaining what information can be RETRIEVED from here."
+        )
+        read_analysis = _timed('read_analysis', lambda: schema_cache.analyze(
+            'sheet_read', columns, sample_data, read_prompt,
+            lambda prompt: get_llm()[1].invoke(prompt), bypass=refresh_summary
+        ))
+        read_desc = read_analysis.summary
+        # The search tool name always keeps the 'search_' prefix for the backend router
+        # Note: sanitization happens inside create_db_function_tool
+        read_tool = _timed('read_tool', lambda: vapi_service.create_db_function_tool(
+            f"search_{db_name.lower().replace(' ', '_')}", 
+            f"SEARCH TOOL: {read_desc}", 
+            columns, 
+            "read"
+        ))
+        return read_desc, read_tool
+
+    # 3. WRITE LOGIC: Specialized Analysis for Data Entry, then the append tool
+    def write_branch():
+        write_prompt = (
+            f"This is a DATA ENTRY tool for the sheet: {db_name}\n"
+            f"Columns: {described_columns}\n"
+            "Explain to the Voice AI exactly what it needs to ask the user to fill these columns. "
+            "Include instructions on being brief and capturing specific details."
+        )
+        write_analysis = _timed('write_analysis', lambda: schema_cache.analyze(
+            'sheet_write', columns, sample_data, write_prompt,
+            lambda prompt: get_llm()[1].invoke(prompt), bypass=refresh_summary
+        ))
+
+        # Use the AI to generate a clean, action-oriented function name
+        # Sanitize to meet Vapi requirements: /^[a-zA-Z0-9_-]{1,64}$/
+        write_func_name = sanitize_function_name(f"log_{db_name.lower().replace(' ', '_')}")
+        write_desc = f"APPEND TOOL: {write_analysis.summary}"
+
+        write_payload = {
+            "type": "function",
+            "function": {
+                "name": write_func_name,
+                "description": write_desc,
+                "parameters": {
+                    "type": "object",
+                    "properties": {col: {"type": "string", "description": f"Caller's {col}"} for col in columns},
+                    "required": columns[:2] # Heuristic: Name and Description/Issue usually first
                 }
+            },
+            "server": {
+                "url": f"{DEPLOYED_URL}/api/execute_sheet_write",
             }
-            write_tool = vapi_service.create_generic_tool(write_payload)
-            if 'id' in write_tool:
-                tool_ids.append(write_tool['id'])
+        }
+        write_tool = _timed('write_tool', lambda: vapi_service.create_generic_tool(write_payload))
+        return write_desc, write_tool
+
+    # The read and write branches don't depend on each other: run them side by side,
+    # so connecting takes as long as the slower branch
+    branches = ([read_branch] if can_read else []) + ([write_branch] if can_write else [])
+    with jobs.stage(job, 'tools_created'):
+        results = run_concurrently(branches)
 
-        # 4. STORE: Save to Django
-        ConnectedDatabase.objects.create(
+    bindings = [] # (tool id, kind, function name) for the tool-routing table
+    if can_read:
+        read_desc, read_tool = results.pop(0)
+        if 'id' in read_tool:
+            tool_ids.append(read_tool['id'])
+            bindings.append((read_tool['id'], 'read', sanitize_function_name(f"search_{db_name.lower().replace(' ', '_')}")))
+    if can_write:
+        write_desc, write_tool = results.pop(0)
+        if 'id' in write_tool:
+            tool_ids.append(write_tool['id'])
+            bindings.append((write_tool['id'], 'write', sanitize_function_name(f"log_{db_name.lower().replace(' ', '_')}")))
+
+    # 4. STORE: Save to Django
+    with jobs.stage(job, 'stored'):
+        db_record = ConnectedDatabase.objects.create(
             name=db_name,
             source_type="googlesheets",
             summary=f"Read: {read_desc if can_read else 'N/A'} | Write: {write_desc if can_write else 'N/A'}",
             columns=columns,
             vapi_tool_ids=tool_ids,
-            data=df_data,
-            connection_details={"spreadsheet_id": spreadsheet_id}
+            connection_details={"spreadsheet_id": spreadsheet_id, "can_read": can_read},
+            column_profile=column_profile,
         )
+        for tool_id, kind, function_name in bindings:
+            tool_routing.bind(db_record, tool_id, kind, function_name)
+        row_store.insert_rows(db_record, df_data)
+        job.database = db_record
+        job.save(update_fields=['database', 'updated_at'])
 
-        return Response({"success": True, "message": f"Successfully linked {db_name}", "tools": tool_ids})
+    with jobs.stage(job, 'indexed'):
+        search_index.build_index(db_record, df_data)
 
-    except Exception as e:
-        print(f"❌ Google Sheets Sync Error: {str(e)}")
-        return Response({"error": str(e)}, status=500)
+    if can_write:
+        # Open the worksheet now, so the first write call is only the append
+        try:
+            get_worksheet(spreadsheet_id)
+        except Exception as e:
+            print(f"⚠️ Could not pre-open the sheet for writes: {e}")
+
+    return {"success": True, "message": f"Successfully linked {db_name}", "tools": tool_ids, "step_timings": step_timings}
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -972,27 +1325,20 @@ def execute_sheet_write(request):
     if not tool_calls:
         print("❌ No tool calls provided")
         return Response({"error": "No tool call provided"}, status=400)
-    
-    call = tool_calls[0]
-    tool_call_id = call.get('id')
-    vapi_tool_id = call.get('toolId')
-    function_name = call.get('function', {}).get('name', '')
-    args = call.get('function', {}).get('arguments', {})
-    
-    # Parse args if it's a string (common with Vapi)
-    if isinstance(args, str):
-        try:
-            args = json.loads(args)
-            print(f"✅ Parsed JSON args: {args}")
-        except json.JSONDecodeError as e:
-            print(f"⚠️ Failed to parse args as JSON: {e}")
-            args = {}
+
+    results = run_tool_calls(tool_calls, run_sheet_write_call)
+    return Response({"results": results}, status=200)
+
+
+def run_sheet_write_call(call):
+    """Appends one write tool call's row to its Google Sheet; returns its Vapi results entry"""
+    tool_call_id, vapi_tool_id, function_name, args = parse_tool_call(call)
 
     print(f"🔍 Looking up database - Function: {function_name}, Tool ID: {vapi_tool_id}")
 
     # 1. DEFENSIVE LOOKUP
-    # First try by Vapi Tool ID (most reliable)
-    db = ConnectedDatabase.objects.filter(vapi_tool_ids__contains=[vapi_tool_id]).first()
+    # First the tool-binding table, by Vapi Tool ID (most reliable) or function name
+    db = tool_routing.resolve(vapi_tool_id, function_name, 'write')
     
     if not db:
         # Try matching by function name (handle sanitized names)
@@ -1020,11 +1366,13 @@ def execute_sheet_write(request):
                     db = candidate_db
                     break
 
+        if db is not None:
+            # Bound now, so the next call for this tool skips the name matching
+            tool_routing.bind(db, vapi_tool_id, 'write', function_name)
+
     if db is None:
         print(f"❌ Database not found for function: {function_name}")
-        return Response({
-            "results": [{"toolCallId": tool_call_id, "result": "Error: DB not found."}]
-        }, status=200)
+        return {"toolCallId": tool_call_id, "result": "Error: DB not found."}
 
     print(f"✅ Found database: {db.name} (ID: {db.id})")
     details = db.connection_details or {}
@@ -1032,9 +1380,7 @@ def execute_sheet_write(request):
     
     if not spreadsheet_id:
         print(f"❌ No spreadsheet_id found in connection_details: {details}")
-        return Response({
-            "results": [{"toolCallId": tool_call_id, "result": "Error: Spreadsheet ID not found."}]
-        }, status=200)
+        return {"toolCallId": tool_call_id, "result": "Error: Spreadsheet ID not found."}
 
     print(f"📊 Spreadsheet ID: {spreadsheet_id}")
     print(f"📋 Columns: {db.columns}")
@@ -1049,55 +1395,43 @@ def execute_sheet_write(request):
         print(f"📦 Prepared row data: {new_row_list}")
 
         # 3. GOOGLE SHEETS WRITE (External)
-        json_path = settings.SERVICE_ACCOUNT_FILE 
-
-        if not os.path.exists(json_path):
-            # This might happen if the Env Var was missing during startup
-            print("❌ Service account file missing! Checking for Env Var...")
-            sa_content = os.getenv('GOOGLE_SERVICE_ACCOUNT_JSON')
-            if sa_content:
-                with open(json_path, 'w') as f:
-                    f.write(sa_content)
-            else:
-                raise FileNotFoundError(f"Service account credentials not found in Env or File.")
-        
-        print(f"🔑 Using service account: {json_path}")
-        scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-        creds = ServiceAccountCredentials.from_json_keyfile_name(json_path, scope)
-        client = gspread.authorize(creds)
-        
-        print(f"📄 Opening spreadsheet: {spreadsheet_id}")
-        spreadsheet = client.open_by_key(spreadsheet_id)
-        sheet = spreadsheet.sheet1
-        
-        print(f"✍️ Appending row to sheet: {sheet.title}")
-        sheet.append_row(new_row_list)
-        print(f"✅ Successfully appended row to Google Sheet")
+        if not settings.SHEET_WRITE_BEHIND:
+            # The client and worksheet handle are cached per process: only the append goes over the wire
+            sheet = append_sheet_row(spreadsheet_id, new_row_list)
+            print(f"✅ Successfully appended row to Google Sheet: {sheet.title}")
 
         # 4. DJANGO DATABASE UPDATE (Internal Sync)
-        # We append the new dictionary to the existing 'data' list
-        current_data = list(db.data) if db.data else [] # Cast to list to be safe
-        current_data.append(new_entry_dict)
-        db.data = current_data
-        db.save() # This commits the new row to your Django DB
-
-        print(f"✅ Synced: Appended to GSheet and Django for {db.name}")
+        # We insert just the new row; the rest of the dataset is untouched.
+        # The version bump is atomic: writes for one sheet can run concurrently.
+        with transaction.atomic():
+            # Bump first: its row lock queues concurrent writers, so their rows commit in id
+            # order and an index watermark never passes a row that is still uncommitted
+            ConnectedDatabase.objects.filter(pk=db.pk).update(data_version=F('data_version') + 1)
+            row_store.append_row(db, new_entry_dict)
+            if settings.SHEET_WRITE_BEHIND:
+                # Queued for the outbox flusher, which batches each sheet's appends (see api/sheet_outbox.py)
+                sheet_outbox.enqueue(db, new_row_list)
+        db.refresh_from_db(fields=['data_version', 'rows_rewritten_version'])
+        # Appends the rows above the index's watermark: this write plus any from other workers
+        search_index.merge_delta(db)
+        result_cache.invalidate(db.id)
+
+        if settings.SHEET_WRITE_BEHIND:
+            print(f"✅ Saved to Django for {db.name}; GSheet append queued in outbox")
+        else:
+            print(f"✅ Synced: Appended to GSheet and Django for {db.name}")
 
-        return Response({
-            "results": [{
-                "toolCallId": tool_call_id, 
-                "result": "I have successfully recorded your entry and updated the system."
-            }]
-        }, status=200)
+        return {
+            "toolCallId": tool_call_id,
+            "result": "I have successfully recorded your entry and updated the system."
+        }
 
     except Exception as e:
         import traceback
         error_trace = traceback.format_exc()
         print(f"❌ Sync Error: {str(e)}")
         print(f"❌ Traceback: {error_trace}")
-        return Response({
-            "results": [{"toolCallId": tool_call_id, "result": f"Sync Error: {str(e)}"}]
-        }, status=200)
+        return {"toolCallId": tool_call_id, "result": f"Sync Error: {str(e)}"}
 
 
 @api_view(['POST'])
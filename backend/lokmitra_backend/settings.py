@@ -195,3 +195,79 @@ CUSTOMER_PHONE = os.getenv('CUSTOMER_PHONE')
 # Google Gemini API Key
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 
+
+# Connected-database search indexes (per worker process)
+SEARCH_INDEX_CACHE_MAX_MB = int(os.getenv('SEARCH_INDEX_CACHE_MAX_MB', '512'))
+# Fuzzy search shortlists rows sharing >= MIN_OVERLAP of the query's trigrams once a dataset has MIN_ROWS rows
+SEARCH_TRIGRAM_MIN_ROWS = int(os.getenv('SEARCH_TRIGRAM_MIN_ROWS', '5000'))
+SEARCH_TRIGRAM_MAX_CANDIDATES = int(os.getenv('SEARCH_TRIGRAM_MAX_CANDIDATES', '2000'))
+SEARCH_TRIGRAM_MIN_OVERLAP = float(os.getenv('SEARCH_TRIGRAM_MIN_OVERLAP', '0.3'))
+
+# Threads shared by the tool calls of one Vapi message (execute_db_query / execute_sheet_write)
+TOOL_CALL_MAX_WORKERS = int(os.getenv('TOOL_CALL_MAX_WORKERS', '8'))
+
+# Tool results returned to Vapi: rows of datasets wider than PROJECT_ABOVE_COLUMNS are
+# projected to matched, key and display columns, and each payload is capped at MAX_BYTES
+TOOL_RESULT_MAX_BYTES = int(os.getenv('TOOL_RESULT_MAX_BYTES', '2000'))
+TOOL_RESULT_MAX_VALUE_CHARS = int(os.getenv('TOOL_RESULT_MAX_VALUE_CHARS', '200'))
+TOOL_RESULT_PROJECT_ABOVE_COLUMNS = int(os.getenv('TOOL_RESULT_PROJECT_ABOVE_COLUMNS', '6'))
+
+# execute_db_query result cache (per worker process); entries are keyed by data_version
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv('RESULT_CACHE_MAX_ENTRIES', '10000'))
+RESULT_CACHE_TTL_SECONDS = int(os.getenv('RESULT_CACHE_TTL_SECONDS', '300'))
+
+# Fuzzy scoring of at least PARALLEL_MIN_ROWS candidates (the trigram shortlist, or the whole corpus
+# when there is none) is split across PARALLEL_WORKERS threads; one such scoring runs per process at a time
+SEARCH_PARALLEL_MIN_ROWS = int(os.getenv('SEARCH_PARALLEL_MIN_ROWS', '50000'))
+SEARCH_PARALLEL_WORKERS = int(os.getenv('SEARCH_PARALLEL_WORKERS', str(max(1, (os.cpu_count() or 2) // 2))))
+
+# Rows per chunk when streaming CSV / Excel uploads into the row table
+INGEST_CHUNK_ROWS = int(os.getenv('INGEST_CHUNK_ROWS', '5000'))
+
+# Background ingestion jobs for the connect endpoints (in-process, no broker)
+INGEST_WORKERS = int(os.getenv('INGEST_WORKERS', '2'))
+INGEST_UPLOAD_DIR = os.getenv('INGEST_UPLOAD_DIR') or None # None: the system temp directory
+
+# Arrow snapshots for the 'arrow' search engine, memory-mapped by every worker
+DATASET_ARROW_DIR = os.getenv('DATASET_ARROW_DIR', str(BASE_DIR / 'datasets'))
+
+# Gemini dataset analyses are reused for identical (prompt kind, columns, sample, prompt) for this long
+SCHEMA_SUMMARY_CACHE_MAX_AGE_DAYS = int(os.getenv('SCHEMA_SUMMARY_CACHE_MAX_AGE_DAYS', '30'))
+
+# Bulk file onboarding (connect-database/bulk/): parser processes, concurrent summaries / tool creations
+# (LLM_WORKERS also caps the files parsed and held in memory at once)
+BULK_INGEST_MAX_FILES = int(os.getenv('BULK_INGEST_MAX_FILES', '50'))
+BULK_INGEST_PARSE_PROCESSES = int(os.getenv('BULK_INGEST_PARSE_PROCESSES', str(min(4, os.cpu_count() or 1))))
+BULK_INGEST_LLM_WORKERS = int(os.getenv('BULK_INGEST_LLM_WORKERS', '4'))
+
+# Google Sheets API requests made through the shared gspread client (see api/utils.py)
+GOOGLE_SHEETS_TIMEOUT_SECONDS = int(os.getenv('GOOGLE_SHEETS_TIMEOUT_SECONDS', '30'))
+
+# Google Sheets write-behind: sheet-write tool calls are acknowledged once queued in the outbox,
+# and a flusher appends each sheet's queued rows in one request every FLUSH_INTERVAL_MS.
+# The flusher is a thread of the process that took the write: with several or short-lived
+# workers, also run `python manage.py flush_sheet_outbox --interval N` when turning this on
+SHEET_WRITE_BEHIND = os.getenv('SHEET_WRITE_BEHIND', 'false').lower() == 'true'
+SHEET_OUTBOX_FLUSH_INTERVAL_MS = int(os.getenv('SHEET_OUTBOX_FLUSH_INTERVAL_MS', '500'))
+SHEET_OUTBOX_BATCH_ROWS = int(os.getenv('SHEET_OUTBOX_BATCH_ROWS', '500'))
+SHEET_OUTBOX_MAX_ATTEMPTS = int(os.getenv('SHEET_OUTBOX_MAX_ATTEMPTS', '10'))
+SHEET_OUTBOX_BASE_BACKOFF_SECONDS = float(os.getenv('SHEET_OUTBOX_BASE_BACKOFF_SECONDS', '2'))
+SHEET_OUTBOX_MAX_BACKOFF_SECONDS = float(os.getenv('SHEET_OUTBOX_MAX_BACKOFF_SECONDS', '300'))
+SHEET_OUTBOX_QUOTA_BACKOFF_SECONDS = float(os.getenv('SHEET_OUTBOX_QUOTA_BACKOFF_SECONDS', '30'))
+SHEET_OUTBOX_CLAIM_TIMEOUT_SECONDS = int(os.getenv('SHEET_OUTBOX_CLAIM_TIMEOUT_SECONDS', '120'))
+
+# Outbound HTTP (Vapi, Supabase Management, Google export) through one pooled keep-alive
+# session per process; 429 / 5xx are retried with jittered backoff (see api/http_client.py)
+HTTP_CLIENT_CONNECT_TIMEOUT_SECONDS = float(os.getenv('HTTP_CLIENT_CONNECT_TIMEOUT_SECONDS', '5'))
+HTTP_CLIENT_READ_TIMEOUT_SECONDS = float(os.getenv('HTTP_CLIENT_READ_TIMEOUT_SECONDS', '30'))
+HTTP_CLIENT_POOL_HOSTS = int(os.getenv('HTTP_CLIENT_POOL_HOSTS', '4'))
+HTTP_CLIENT_POOL_SIZE = int(os.getenv('HTTP_CLIENT_POOL_SIZE', '20'))
+HTTP_CLIENT_MAX_RETRIES = int(os.getenv('HTTP_CLIENT_MAX_RETRIES', '3'))
+HTTP_CLIENT_BASE_BACKOFF_SECONDS = float(os.getenv('HTTP_CLIENT_BASE_BACKOFF_SECONDS', '0.5'))
+HTTP_CLIENT_MAX_BACKOFF_SECONDS = float(os.getenv('HTTP_CLIENT_MAX_BACKOFF_SECONDS', '10'))
+HTTP_CLIENT_ASYNC_MAX_CONNECTIONS = int(os.getenv('HTTP_CLIENT_ASYNC_MAX_CONNECTIONS', '200')) # Per event loop (ASGI worker)
+
+# Serve start-outbound-calling, start-inbound-agent and upload-document with the async views
+# (api/async_views.py). Enable when running under ASGI, e.g.
+# gunicorn lokmitra_backend.asgi:application -k uvicorn.workers.UvicornWorker
+ASYNC_CONTROL_VIEWS = os.getenv('ASYNC_CONTROL_VIEWS', 'false').lower() == 'true'
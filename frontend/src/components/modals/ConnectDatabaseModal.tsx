@@ -12,6 +12,28 @@ interface ConnectDatabaseModalProps {
 
 type DataSourceType = 'supabase' | 'excel' | 'csv' | 'googlesheets';
 
+// Connect endpoints queue a background ingestion job; these label its completed stages
+const STAGE_LABELS: Record<string, string> = {
+  parsed: 'Data read. Generating AI summary...',
+  profiled: 'Columns profiled. Generating AI summary...',
+  summarized: 'Summary ready. Creating Vapi tools...',
+  deployed: 'Edge Function deployed. Creating Vapi tools...',
+  tools_created: 'Tools created. Storing dataset...',
+  stored: 'Dataset stored. Building search index...',
+  indexed: 'Search index ready.',
+};
+const JOB_POLL_INTERVAL_MS = 1500;
+
+const waitForIngestionJob = async (jobId: number, onStage: (stage: string) => void) => {
+  while (true) {
+    const { data: job } = await axios.get(API_ENDPOINTS.INGESTION_JOB(jobId));
+    if (job.stage) onStage(job.stage);
+    if (job.status === 'succeeded') return job;
+    if (job.status === 'failed') throw new Error(job.error || 'Ingestion failed');
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+  }
+};
+
 export default function ConnectDatabaseModal({ isOpen, onClose, accentColor }: ConnectDatabaseModalProps) {
   const [sourceType, setSourceType] = useState<DataSourceType>('supabase');
   
@@ -83,7 +105,12 @@ export default function ConnectDatabaseModal({ isOpen, onClose, accentColor }: C
 
     try {
       const response = await axios.post(endpoint, formData);
-      
+
+      // 202: the backend is ingesting in the background; follow the job until it finishes
+      if (response.status === 202 && response.data.job_id) {
+        await waitForIngestionJob(response.data.job_id, (stage) => setStatusMessage(STAGE_LABELS[stage] || stage));
+      }
+
       if (response.data.success) {
         setStatusMessage('Success! Sahayaki is now Synced.');
         setTimeout(() => {
@@ -93,7 +120,7 @@ export default function ConnectDatabaseModal({ isOpen, onClose, accentColor }: C
       }
     } catch (err: any) {
       console.error("Connection error:", err);
-      alert(err.response?.data?.error || "Failed to establish connection. Check console for details.");
+      alert(err.response?.data?.error || err.message || "Failed to establish connection. Check console for details.");
     } finally {
       setIsProcessing(false);
       setStatusMessage('');
@@ -46,8 +46,10 @@ export const API_ENDPOINTS = {
   GET_DATABASES: `${API_BASE_URL}/api/get-databases/`,
   DELETE_DATABASE: `${API_BASE_URL}/api/delete-database/`,
   CONNECT_DATABASE: `${API_BASE_URL}/api/connect-database/`,
+  CONNECT_DATABASE_BULK: `${API_BASE_URL}/api/connect-database/bulk/`,
   CONNECT_SUPABASE: `${API_BASE_URL}/api/connect-supabase/`,
   CONNECT_GOOGLE_SHEETS: `${API_BASE_URL}/api/connect-google-sheets/`,
+  INGESTION_JOB: (id: string | number) => `${API_BASE_URL}/api/ingestion-jobs/${id}/`,
   UPLOAD_CSV: `${API_BASE_URL}/api/upload-csv/`,
 } as const;
 